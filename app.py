@@ -1,27 +1,187 @@
-from flask import Flask, request, jsonify
+import csv
+import hmac
+import importlib
+import json
+import math
+import os
+import queue
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import (Blueprint, Flask, Response, abort, current_app, g, jsonify, request,
+                   send_from_directory, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateIndex, CreateTable
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
+
+# Extensions et routes sans application : create_app() (en fin de fichier) les assemble
+db = SQLAlchemy()
+bp = Blueprint('convertis', __name__, cli_group=None)  # routes d'une paroisse, aussi sous /paroisses/<cle>
+bp_admin = Blueprint('admin', __name__)  # lieux partagés, paroisses, administration : sans préfixe
+
+# ⏳ Attente du verrou d'écriture : le busy handler de SQLite dort dans le C, ce qui sous
+# gevent fige tous les greenlets du worker (flux SSE compris). Il est réduit à
+# ATTENTE_VERROU_C ; au-delà, l'instruction est rejouée après un time.sleep coopératif.
+ATTENTE_VERROU_C = 20  # ms
+DELAI_VERROU = 5.0  # s, attente totale avant « database is locked »
+SQLITE_BUSY = 5
+
+def reessayer_si_verrouille(operation, *args):
+    limite = time.monotonic() + DELAI_VERROU
+    pause = 0.005
+    while True:
+        try:
+            return operation(*args)
+        except sqlite3.OperationalError as e:
+            # SQLITE_BUSY seul : BUSY_SNAPSHOT (instantané périmé) exige un rollback, pas une attente
+            if getattr(e, 'sqlite_errorcode', None) != SQLITE_BUSY or time.monotonic() >= limite:
+                raise
+        time.sleep(pause * (1 + random.random()))
+        pause = min(pause * 2, 0.1)
+
+class CurseurCooperatif(sqlite3.Cursor):
+    def execute(self, *args):
+        return reessayer_si_verrouille(super().execute, *args)
+
+    def executemany(self, *args):
+        return reessayer_si_verrouille(super().executemany, *args)
+
+class ConnexionCooperative(sqlite3.Connection):
+    # sqlite3.connect(..., factory=ConnexionCooperative) : base (via le moteur) et cache local
+    def cursor(self, factory=CurseurCooperatif):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return reessayer_si_verrouille(super().execute, *args)
+
+    def executemany(self, *args):
+        return reessayer_si_verrouille(super().executemany, *args)
+
+    def commit(self):
+        return reessayer_si_verrouille(super().commit)
+
+# WAL : les lectures ne bloquent plus les écritures (ni l'inverse), ce qui garde
+# les verrous d'écriture très courts quand plusieurs requêtes sont en vol.
+@event.listens_for(Engine, 'connect')
+def configurer_sqlite(connexion, _):
+    if isinstance(connexion, sqlite3.Connection):
+        curseur = connexion.cursor()
+        curseur.execute('PRAGMA journal_mode=WAL')
+        curseur.execute('PRAGMA synchronous=NORMAL')
+        curseur.execute(f'PRAGMA busy_timeout={ATTENTE_VERROU_C}')
+        curseur.close()
+
+# 🗺️ Référentiel des lieux (commune > fokontany > quartier)
+class Commune(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nom = db.Column(db.String(100), nullable=False)
+    cle = db.Column(db.String(100), nullable=False, unique=True)
+
+class Fokontany(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    commune_id = db.Column(db.Integer, db.ForeignKey('commune.id'), nullable=False, index=True)
+    nom = db.Column(db.String(100), nullable=False)
+    cle = db.Column(db.String(100), nullable=False)
+    # Centroïde (WGS84) pour la carte ; geohash = cellule de grille, préfixe selon le zoom
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(9), nullable=True)
+    __table_args__ = (db.UniqueConstraint('commune_id', 'cle'),
+                      db.Index('ix_fokontany_position', 'latitude', 'longitude'))
+
+class Quartier(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    fokontany_id = db.Column(db.Integer, db.ForeignKey('fokontany.id'), nullable=False, index=True)
+    nom = db.Column(db.String(100), nullable=False)
+    cle = db.Column(db.String(100), nullable=False)
+    __table_args__ = (db.UniqueConstraint('fokontany_id', 'cle'),)
+
+# Alias d'orthographe : "tana" -> "antananarivo", appliqués à l'insertion
+class AliasLieu(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(20), nullable=False)  # commune, fokontany ou quartier
+    alias = db.Column(db.String(100), nullable=False)
+    cible = db.Column(db.String(100), nullable=False)
+    __table_args__ = (db.UniqueConstraint('type', 'alias'),)
+
+TYPES_LIEU = {'commune': Commune, 'fokontany': Fokontany, 'quartier': Quartier}
 
-app = Flask(__name__)
-CORS(app)
+# ⛪ Paroisses (ou districts) : chaque inscription appartient à une seule paroisse.
+# Les lieux restent partagés ; les routes sans préfixe servent la paroisse par défaut.
+PAROISSE_DEFAUT = 1
 
-# Configuration de SQLite
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///convertis.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+class Paroisse(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    cle = db.Column(db.String(50), nullable=False, unique=True)  # /paroisses/<cle>/convertis...
+    nom = db.Column(db.String(100), nullable=False)
+    date_creation = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
-db = SQLAlchemy(app)
+    def to_dict(self):
+        return {'id': self.id, 'cle': self.cle, 'nom': self.nom,
+                'date_creation': self.date_creation.strftime('%Y-%m-%d %H:%M:%S')}
 
 # Modèle de données
 class PersonneConvertie(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    paroisse_id = db.Column(db.Integer, db.ForeignKey('paroisse.id'), nullable=False,
+                            server_default=text(str(PAROISSE_DEFAUT)))
     nom = db.Column(db.String(100), nullable=False)
     prenom = db.Column(db.String(100), nullable=False)
     telephone = db.Column(db.String(20), nullable=True)
-    commune = db.Column(db.String(100), nullable=False)
-    fokontany = db.Column(db.String(100), nullable=False)
-    quartier = db.Column(db.String(100), nullable=True)
+    commune_id = db.Column(db.Integer, db.ForeignKey('commune.id'), nullable=False, index=True)
+    fokontany_id = db.Column(db.Integer, db.ForeignKey('fokontany.id'), nullable=False, index=True)
+    quartier_id = db.Column(db.Integer, db.ForeignKey('quartier.id'), nullable=True, index=True)
     nom_inviteur = db.Column(db.String(100), nullable=True)  # Changed to nullable=True
     date_ajout = db.Column(db.DateTime, default=db.func.current_timestamp())
+    nom_phonetique = db.Column(db.String(100), nullable=True)
+    prenom_phonetique = db.Column(db.String(100), nullable=True)
+    supprime_le = db.Column(db.DateTime, nullable=True, index=True)  # suppression logique
+
+    lieu_commune = db.relationship(Commune, lazy='joined')
+    lieu_fokontany = db.relationship(Fokontany, lazy='joined')
+    lieu_quartier = db.relationship(Quartier, lazy='joined')
+
+    # Index composites menés par la paroisse : une requête ne parcourt que les lignes de
+    # sa paroisse, quelle que soit la taille des autres. date_ajout seul sert à l'archivage.
+    __table_args__ = (
+        db.Index('ix_personne_convertie_date_ajout', 'date_ajout'),
+        db.Index('ix_personne_convertie_paroisse_date', 'paroisse_id', 'date_ajout'),
+        db.Index('ix_personne_convertie_paroisse_commune_date', 'paroisse_id', 'commune_id', 'date_ajout'),
+        # supprime_le avant la date : couvrant pour la liste des inviteurs actifs, trié pour les filtres
+        db.Index('ix_personne_convertie_paroisse_inviteur_actifs', 'paroisse_id', 'nom_inviteur', 'supprime_le',
+                 'date_ajout'),
+        db.Index('ix_personne_convertie_paroisse_phonetique', 'paroisse_id', 'nom_phonetique'),
+        # Comptage couvrant par fokontany pour /convertis/carte
+        db.Index('ix_personne_convertie_paroisse_fokontany', 'paroisse_id', 'fokontany_id', 'supprime_le'),
+        # Quartiers utilisés par la paroisse (/convertis/unique-values)
+        db.Index('ix_personne_convertie_paroisse_quartier', 'paroisse_id', 'quartier_id', 'supprime_le'),
+    )
+
+    @property
+    def commune(self):
+        return self.lieu_commune.nom
+
+    @property
+    def fokontany(self):
+        return self.lieu_fokontany.nom
+
+    @property
+    def quartier(self):
+        return self.lieu_quartier.nom if self.lieu_quartier else ''
 
     def to_dict(self):
         return {
@@ -36,1162 +196,2631 @@ class PersonneConvertie(db.Model):
             'data_ajout': self.date_ajout.strftime('%Y-%m-%d %H:%M:%S') if self.date_ajout else None
         }
 
-# Création de la base
-with app.app_context():
+def paroisse_courante():
+    # Fixée par l'URL pour une requête, par la tâche pour un import ; None (toutes les
+    # paroisses) pour les tâches de maintenance et les commandes
+    return g.get('paroisse_id')
+
+def filtre_paroisse(colonne_paroisse, colonne_id, ids, paroisse):
+    # Avec une liste d'ids, « paroisse_id + 0 » écarte les index menés par la paroisse :
+    # SQLite les préfère sinon à la clé primaire et parcourt toute la paroisse
+    if ids is None:
+        return [colonne_paroisse == paroisse]
+    return [colonne_id.in_(ids), colonne_paroisse + 0 == paroisse]
+
+def convertis_paroisse(ids=None):
+    # Inscriptions de la paroisse courante, suppressions logiques comprises ; ids : par clé primaire
+    paroisse = paroisse_courante()
+    if paroisse is None:
+        requete = PersonneConvertie.query
+        return requete if ids is None else requete.filter(PersonneConvertie.id.in_(ids))
+    return PersonneConvertie.query.filter(
+        *filtre_paroisse(PersonneConvertie.paroisse_id, PersonneConvertie.id, ids, paroisse))
+
+def convertis_actifs(ids=None):
+    # Point de départ de toutes les lectures : exclut les suppressions logiques
+    return convertis_paroisse(ids).filter(PersonneConvertie.supprime_le.is_(None))
+
+_ids_paroisses = {}  # cle -> id, par worker (une paroisse n'est ni renommée ni supprimée)
+
+@bp.url_value_preprocessor
+def choisir_paroisse(endpoint, valeurs):
+    # /paroisses/<cle>/... : paroisse de l'URL (404 si inconnue) ; sans préfixe : paroisse par défaut
+    cle = valeurs.pop('paroisse', None) if valeurs else None
+    if cle is None:
+        g.paroisse_id = PAROISSE_DEFAUT
+        return
+    if cle not in _ids_paroisses:
+        paroisse = Paroisse.query.filter_by(cle=cle).first()
+        if paroisse is None:
+            abort(404, description='Paroisse inconnue')
+        _ids_paroisses[cle] = paroisse.id
+    g.paroisse_id = _ids_paroisses[cle]
+
+# ⚡ Sérialisation rapide : colonnes lues directement en SQL, sans objets ORM
+COLONNES_CONVERTI = ('id', 'nom', 'prenom', 'telephone', 'commune', 'fokontany',
+                     'quartier', 'nom_inviteur', 'data_ajout')
+
+def selection_convertis(source=None, ids=None):
+    # Même forme que to_dict(), date déjà formatée par SQLite.
+    # source : table chaude par défaut, ou la vue convertis_tous (archives comprises) ; ids : par clé primaire
+    t = PersonneConvertie.__table__ if source is None else source
+    paroisse = paroisse_courante()
+    requete = (db.select(t.c.id, t.c.nom, t.c.prenom, t.c.telephone, Commune.nom, Fokontany.nom,
+                         db.func.coalesce(Quartier.nom, ''), t.c.nom_inviteur,
+                         db.func.strftime('%Y-%m-%d %H:%M:%S', t.c.date_ajout))
+               .join(Commune, t.c.commune_id == Commune.id)
+               .join(Fokontany, t.c.fokontany_id == Fokontany.id)
+               .outerjoin(Quartier, t.c.quartier_id == Quartier.id))
+    if paroisse is not None:
+        requete = requete.where(*filtre_paroisse(t.c.paroisse_id, t.c.id, ids, paroisse))
+    elif ids is not None:
+        requete = requete.where(t.c.id.in_(ids))
+    return requete.where(t.c.supprime_le.is_(None)) if source is None else requete
+
+def lignes_en_dicts(lignes):
+    return [dict(zip(COLONNES_CONVERTI, ligne)) for ligne in lignes]
+
+# Index trigrammes sur nom/prénom pour la recherche de doublons, par paroisse
+class TrigrammeNom(db.Model):
+    paroisse_id = db.Column(db.Integer, primary_key=True)
+    trigramme = db.Column(db.String(3), primary_key=True)
+    personne_id = db.Column(db.Integer, db.ForeignKey('personne_convertie.id'), primary_key=True, index=True)
+    # Sans rowid : la table est l'index de clé primaire, stocké une seule fois
+    __table_args__ = {'sqlite_with_rowid': False}
+
+# Suivi des imports en masse (partagé entre workers via la base)
+class TacheImport(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    paroisse_id = db.Column(db.Integer, nullable=False, server_default=text(str(PAROISSE_DEFAUT)))
+    fichier = db.Column(db.String(255), nullable=False)
+    statut = db.Column(db.String(20), nullable=False, default='en_attente')  # en_cours, termine, echec
+    lignes_lues = db.Column(db.Integer, nullable=False, default=0)
+    lignes_inserees = db.Column(db.Integer, nullable=False, default=0)
+    nb_erreurs = db.Column(db.Integer, nullable=False, default=0)
+    erreurs = db.Column(db.Text, nullable=False, default='[]')  # JSON, tronqué
+    message = db.Column(db.Text, nullable=True)
+    date_creation = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    date_fin = db.Column(db.DateTime, nullable=True)
+    # Reprise après un worker recyclé ou tué : copie temporaire, dernière ligne validée,
+    # thread propriétaire (pid:aléa) et battement de cœur mis à jour à chaque lot
+    chemin = db.Column(db.String(500), nullable=True)
+    derniere_ligne = db.Column(db.Integer, nullable=False, server_default=text('0'))
+    executant = db.Column(db.String(40), nullable=True)
+    maj_le = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'fichier': self.fichier,
+            'statut': self.statut,
+            'lignes_lues': self.lignes_lues,
+            'lignes_inserees': self.lignes_inserees,
+            'nb_erreurs': self.nb_erreurs,
+            'derniere_ligne': self.derniere_ligne,
+            'erreurs': json.loads(self.erreurs),
+            'message': self.message,
+            'date_creation': self.date_creation.strftime('%Y-%m-%d %H:%M:%S'),
+            'date_fin': self.date_fin.strftime('%Y-%m-%d %H:%M:%S') if self.date_fin else None
+        }
+
+# Bail partagé entre workers pour les tâches de maintenance
+class VerrouMaintenance(db.Model):
+    nom = db.Column(db.String(50), primary_key=True)
+    expire_le = db.Column(db.DateTime, nullable=False)
+
+# Journal des modifications, lu par le diffuseur SSE de chaque worker
+class EvenementConverti(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(10), nullable=False)  # insert ou delete
+    paroisse_id = db.Column(db.Integer, nullable=True)  # None : concerne toutes les paroisses
+    donnees = db.Column(db.Text, nullable=False)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    __table_args__ = {'sqlite_autoincrement': True}  # pas de réutilisation des ids après purge
+
+# Inscriptions par paroisse, jour (heure de Madagascar) et commune, tenues à jour à l'écriture.
+# Archives comprises : l'archivage ne change pas les compteurs, une suppression si.
+class CompteurJour(db.Model):
+    paroisse_id = db.Column(db.Integer, primary_key=True)
+    jour = db.Column(db.Date, primary_key=True)
+    commune_id = db.Column(db.Integer, db.ForeignKey('commune.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_compteur_jour_paroisse_commune_jour', 'paroisse_id', 'commune_id', 'jour'),)
+
+# 🔤 Canonicalisation des noms de lieux
+def _sans_accents(valeur):
+    valeur = unicodedata.normalize('NFKD', valeur or '')
+    return ''.join(c for c in valeur if not unicodedata.combining(c)).lower()
+
+def cle_lieu(valeur):
+    # Clé de comparaison : sans accents, minuscules, séparateurs réduits à un espace
+    return re.sub(r'[\s\-_.\']+', ' ', _sans_accents(valeur)).strip()
+
+def nom_canonique(valeur):
+    return re.sub(r'\s+', ' ', (valeur or '').strip())
+
+def cle_resolue(type_lieu, valeur):
+    cle = cle_lieu(valeur)
+    alias = AliasLieu.query.filter_by(type=type_lieu, alias=cle).first()
+    return alias.cible if alias else cle
+
+def _obtenir_ou_creer(modele, valeur, **parent):
+    cle = cle_resolue(modele.__tablename__, valeur)
+    lieu = modele.query.filter_by(cle=cle, **parent).first()
+    if lieu:
+        return lieu
+    try:
+        # Savepoint : un autre worker peut créer le même lieu en parallèle
+        with db.session.begin_nested():
+            lieu = modele(nom=nom_canonique(valeur), cle=cle, **parent)
+            db.session.add(lieu)
+    except IntegrityError:
+        lieu = modele.query.filter_by(cle=cle, **parent).one()
+    return lieu
+
+def resoudre_lieux(commune, fokontany, quartier=None):
+    # Retourne (commune_id, fokontany_id, quartier_id), en créant les lieux inconnus
+    c = _obtenir_ou_creer(Commune, commune)
+    f = _obtenir_ou_creer(Fokontany, fokontany, commune_id=c.id)
+    q = _obtenir_ou_creer(Quartier, quartier, fokontany_id=f.id) if cle_lieu(quartier) else None
+    return c.id, f.id, q.id if q else None
+
+def trouver_lieu(type_lieu, valeur, **parent):
+    # Recherche sans création (pour les filtres)
+    modele = TYPES_LIEU[type_lieu]
+    return modele.query.filter_by(cle=cle_resolue(type_lieu, valeur), **parent).first()
+
+def _fusionner_lieu(source, cible):
+    # Rattache tout ce qui pointe vers `source` à `cible`, puis supprime `source`
+    if isinstance(source, Commune):
+        PersonneConvertie.query.filter_by(commune_id=source.id).update({'commune_id': cible.id})
+        db.session.execute(text(
+            'INSERT INTO compteur_jour (paroisse_id, jour, commune_id, total) '
+            'SELECT paroisse_id, jour, :cible, total FROM compteur_jour WHERE commune_id = :source '
+            'ON CONFLICT (paroisse_id, jour, commune_id) DO UPDATE SET total = total + excluded.total'),
+            {'cible': cible.id, 'source': source.id})
+        CompteurJour.query.filter_by(commune_id=source.id).delete()
+        for enfant in Fokontany.query.filter_by(commune_id=source.id).all():
+            doublon = Fokontany.query.filter_by(commune_id=cible.id, cle=enfant.cle).first()
+            if doublon:
+                _fusionner_lieu(enfant, doublon)
+            else:
+                enfant.commune_id = cible.id
+    elif isinstance(source, Fokontany):
+        PersonneConvertie.query.filter_by(fokontany_id=source.id).update({'fokontany_id': cible.id})
+        if cible.latitude is None and source.latitude is not None:
+            definir_centroide(cible, source.latitude, source.longitude)
+        for enfant in Quartier.query.filter_by(fokontany_id=source.id).all():
+            doublon = Quartier.query.filter_by(fokontany_id=cible.id, cle=enfant.cle).first()
+            if doublon:
+                _fusionner_lieu(enfant, doublon)
+            else:
+                enfant.fokontany_id = cible.id
+    else:
+        PersonneConvertie.query.filter_by(quartier_id=source.id).update({'quartier_id': cible.id})
+    db.session.flush()
+    db.session.delete(source)
+    db.session.flush()
+
+def enregistrer_alias(type_lieu, alias, cible):
+    # Invariant : une cible n'est jamais elle-même un alias, un seul saut suffit à cle_resolue.
+    # ValueError si l'alias ramène au même lieu (cycle).
+    modele = TYPES_LIEU[type_lieu]
+    cle_alias, cle_cible = cle_lieu(alias), cle_resolue(type_lieu, cible)
+    if cle_cible == cle_alias:
+        raise ValueError('L\'alias et la cible désignent déjà le même lieu')
+    # Les alias qui menaient à l'ancienne orthographe suivent vers la nouvelle cible
+    AliasLieu.query.filter_by(type=type_lieu, cible=cle_alias).update({'cible': cle_cible})
+    # Orthographe affichée : celle d'un lieu déjà connu sous la cible, sinon celle fournie
+    reference = modele.query.filter_by(cle=cle_cible).first()
+    nom_cible = reference.nom if reference else nom_canonique(cible)
+    entree = AliasLieu.query.filter_by(type=type_lieu, alias=cle_alias).first()
+    if entree:
+        entree.cible = cle_cible
+    else:
+        db.session.add(AliasLieu(type=type_lieu, alias=cle_alias, cible=cle_cible))
+    # Fusionne les variantes déjà enregistrées sous l'orthographe alias
+    parent = {'commune': None, 'fokontany': 'commune_id', 'quartier': 'fokontany_id'}[type_lieu]
+    for source in modele.query.filter_by(cle=cle_alias).all():
+        filtre = {parent: getattr(source, parent)} if parent else {}
+        existant = modele.query.filter_by(cle=cle_cible, **filtre).first()
+        if existant and existant.id == source.id:
+            continue  # jamais de fusion d'un lieu avec lui-même : il serait supprimé
+        if existant:
+            _fusionner_lieu(source, existant)
+        else:
+            source.cle, source.nom = cle_cible, nom_cible
+    db.session.commit()
+    cache_reponses.vider()  # des personnes ont pu changer de commune
+    cache_partage().incrementer(CLE_VERSION)
+
+# 🔎 Recherche floue de noms (Rakotomalala ~ Rakotomalal)
+SEUIL_SIMILARITE = 0.4
+# Au-delà, un trigramme ('  r', ' ra', 'her'...) est trop courant pour départager : il est
+# ignoré dans la recherche de candidats, dont le coût reste ainsi borné
+MAX_OCCURRENCES_TRIGRAMME = 2000
+_REMPLACEMENTS_PHONETIQUES = [
+    (re.compile(r'ph'), 'f'), (re.compile(r'[ckq]'), 'k'), (re.compile(r'z'), 's'),
+    (re.compile(r'y'), 'i'), (re.compile(r'h'), ''), (re.compile(r'[^a-z]'), ''),
+]
+
+def cle_phonetique(valeur):
+    # Première lettre + squelette consonantique sans doublons : rakotomalala -> rktml
+    mot = _sans_accents(valeur)
+    for motif, remplacement in _REMPLACEMENTS_PHONETIQUES:
+        mot = motif.sub(remplacement, mot)
+    if not mot:
+        return ''
+    squelette = re.sub(r'[aeiou]', '', mot[1:])
+    return mot[0] + re.sub(r'(.)\1+', r'\1', squelette)
+
+def trigrammes(*valeurs):
+    resultat = set()
+    for valeur in valeurs:
+        for mot in re.findall(r'[a-z0-9]+', _sans_accents(valeur)):
+            mot = f'  {mot} '
+            resultat.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return resultat
+
+def indexer_noms(personnes):
+    for personne in personnes:
+        personne.nom_phonetique = cle_phonetique(personne.nom)
+        personne.prenom_phonetique = cle_phonetique(personne.prenom)
+    db.session.flush()
+    db.session.add_all(TrigrammeNom(paroisse_id=personne.paroisse_id, trigramme=t, personne_id=personne.id)
+                       for personne in personnes
+                       for t in trigrammes(personne.nom, personne.prenom))
+
+def chercher_doublons(nom, prenom='', limite=10):
+    cibles = trigrammes(nom, prenom)
+    if not cibles:
+        return []
+    # Candidats : même clé phonétique, ou au moins la moitié des trigrammes en commun
+    candidats = {i for (i,) in convertis_actifs().with_entities(PersonneConvertie.id)
+                 .filter_by(nom_phonetique=cle_phonetique(nom)).limit(200)}
+    # Clé primaire (paroisse, trigramme, personne) : seuls les trigrammes de la paroisse sont lus.
+    # Fréquences mesurées en une requête, au plus MAX_OCCURRENCES_TRIGRAMME + 1 entrées chacune
+    paroisse = paroisse_courante()
+    cibles_triees = sorted(cibles)
+    frequences = db.session.execute(db.select(*(
+        db.select(db.func.count()).select_from(
+            db.select(TrigrammeNom.personne_id)
+            .where(TrigrammeNom.paroisse_id == paroisse, TrigrammeNom.trigramme == t)
+            .limit(MAX_OCCURRENCES_TRIGRAMME + 1).subquery()).scalar_subquery()
+        for t in cibles_triees))).one()
+    selectifs = [t for t, n in zip(cibles_triees, frequences) if n <= MAX_OCCURRENCES_TRIGRAMME]
+    if selectifs:
+        requete = (db.session.query(TrigrammeNom.personne_id)
+                   .filter(TrigrammeNom.paroisse_id == paroisse, TrigrammeNom.trigramme.in_(selectifs))
+                   .group_by(TrigrammeNom.personne_id)
+                   .having(db.func.count() >= (len(selectifs) + 1) // 2)
+                   .order_by(db.func.count().desc())
+                   .limit(200))
+        candidats.update(i for (i,) in requete)
+    if not candidats:
+        return []
+    # Score sur les seules colonnes utiles ; objets complets pour les retenus uniquement
+    scores = {}
+    for id, nom_candidat, prenom_candidat, phonetique in convertis_actifs(candidats).with_entities(
+            PersonneConvertie.id, PersonneConvertie.nom, PersonneConvertie.prenom,
+            PersonneConvertie.nom_phonetique):
+        # Sans prénom fourni, on ne compare que les noms
+        autres = trigrammes(nom_candidat, prenom_candidat if prenom else '')
+        score = len(cibles & autres) / len(cibles | autres)
+        if phonetique == cle_phonetique(nom):
+            score = min(1.0, score + 0.2)
+        if score >= SEUIL_SIMILARITE:
+            scores[id] = score
+    retenus = sorted(scores, key=lambda i: (-scores[i], i))[:limite]
+    personnes = {p.id: p for p in convertis_actifs(retenus)}
+    return [dict(personnes[i].to_dict(), score=round(scores[i], 3)) for i in retenus]
+
+# Ajoute les colonnes (et leurs index) absentes d'une base créée par une version antérieure
+def ajouter_colonnes_manquantes(modele):
+    table = modele.__table__
+    existantes = {c['name'] for c in inspect(db.engine).get_columns(table.name)}
+    with db.engine.begin() as conn:
+        for colonne in table.columns:
+            if colonne.name not in existantes:
+                type_sql = colonne.type.compile(dialect=db.engine.dialect)
+                if colonne.server_default is not None:
+                    # Valeur par défaut obligatoire pour ajouter une colonne NOT NULL
+                    type_sql += f' NOT NULL DEFAULT {colonne.server_default.arg}'
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {colonne.name} {type_sql}'))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+# Index remplacés par leurs équivalents menés par paroisse_id, ou jamais lus
+INDEX_REMPLACES = ['ix_personne_convertie_prenom_phonetique',
+                   'ix_personne_convertie_commune_date', 'ix_personne_convertie_inviteur_date',
+                   'ix_personne_convertie_fokontany_supprime', 'ix_personne_convertie_nom_phonetique',
+                   'ix_personne_convertie_paroisse_inviteur_date']
+
+# Migration : base mono-paroisse -> tout est rattaché à la paroisse par défaut
+def migrer_paroisses():
+    if db.session.get(Paroisse, PAROISSE_DEFAUT) is None:
+        db.session.add(Paroisse(id=PAROISSE_DEFAUT, cle='principale', nom='Paroisse principale'))
+        db.session.commit()
+    inspecteur = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for nom in inspecteur.get_table_names():
+            if nom.startswith(PREFIXE_ARCHIVE) and 'paroisse_id' not in {
+                    c['name'] for c in inspecteur.get_columns(nom)}:
+                conn.execute(text(f'ALTER TABLE {nom} ADD COLUMN paroisse_id INTEGER NOT NULL '
+                                  f'DEFAULT {PAROISSE_DEFAUT}'))
+                conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{nom}_paroisse_commune '
+                                  f'ON {nom} (paroisse_id, commune_id)'))
+        for index in INDEX_REMPLACES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index}'))
+    # Clé primaire changée : index de noms et compteurs sont recréés puis recalculés
+    for modele in (TrigrammeNom, CompteurJour):
+        if 'paroisse_id' not in {c['name'] for c in inspecteur.get_columns(modele.__tablename__)}:
+            modele.__table__.drop(db.engine)
+            modele.__table__.create(db.engine)
+            if modele is TrigrammeNom:
+                reconstruire_index_noms()  # compteurs : recalculés par initialiser_base
+
+def migrer_index_noms():
+    # Table de trigrammes d'une version antérieure (avec rowid), ou dont la clé étrangère a
+    # été réécrite vers personne_convertie_v1 par migrer_lieux : recréée
+    sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'trigramme_nom'")).scalar()
+    db.session.commit()
+    if sql and ('WITHOUT ROWID' not in sql.upper() or 'personne_convertie_v1' in sql):
+        TrigrammeNom.__table__.drop(db.engine)
+        TrigrammeNom.__table__.create(db.engine)
+        reconstruire_index_noms()
+
+def migrer_recherche_floue():
+    indexer_noms(PersonneConvertie.query.filter(PersonneConvertie.nom_phonetique.is_(None)).all())
+    db.session.commit()
+
+def normaliser_inviteurs():
+    # Inscriptions antérieures à la normalisation : "rakoto" et "Rakoto" ne font plus qu'un
+    tables = [PersonneConvertie.__tablename__] + [
+        nom for nom in inspect(db.engine).get_table_names() if nom.startswith(PREFIXE_ARCHIVE)]
+    modifies = 0
+    for table in tables:
+        for nom in db.session.execute(text(
+                f"SELECT DISTINCT nom_inviteur FROM {table} WHERE nom_inviteur != ''")).scalars().all():
+            if _nom_propre(nom) != nom:
+                modifies += db.session.execute(text(
+                    f'UPDATE {table} SET nom_inviteur = :propre WHERE nom_inviteur = :nom'),
+                    {'propre': _nom_propre(nom), 'nom': nom}).rowcount
+    db.session.commit()
+    if modifies:
+        cache_reponses.vider()
+        cache_partage().incrementer(CLE_VERSION)
+
+# Migration : anciennes colonnes texte commune/fokontany/quartier -> clés entières
+def migrer_lieux():
+    colonnes = {c['name'] for c in inspect(db.engine).get_columns('personne_convertie')}
+    if 'commune' not in colonnes:
+        return
+    # legacy_alter_table : le renommage ne réécrit pas les clés étrangères des tables déjà
+    # créées par create_all (trigramme_nom), qui doivent rester sur personne_convertie
+    db.session.execute(text('PRAGMA legacy_alter_table=ON'))
+    db.session.execute(text('ALTER TABLE personne_convertie RENAME TO personne_convertie_v1'))
+    db.session.execute(text('PRAGMA legacy_alter_table=OFF'))
+    PersonneConvertie.__table__.create(db.session.connection())
+    triplets = db.session.execute(text(
+        'SELECT DISTINCT commune, fokontany, quartier FROM personne_convertie_v1')).all()
+    for commune, fokontany, quartier in triplets:
+        commune_id, fokontany_id, quartier_id = resoudre_lieux(commune, fokontany, quartier)
+        db.session.execute(text(
+            'INSERT INTO personne_convertie '
+            '(id, nom, prenom, telephone, commune_id, fokontany_id, quartier_id, nom_inviteur, date_ajout) '
+            'SELECT id, nom, prenom, telephone, :commune_id, :fokontany_id, :quartier_id, nom_inviteur, date_ajout '
+            'FROM personne_convertie_v1 '
+            'WHERE commune IS :commune AND fokontany IS :fokontany AND quartier IS :quartier'
+        ), {'commune_id': commune_id, 'fokontany_id': fokontany_id, 'quartier_id': quartier_id,
+            'commune': commune, 'fokontany': fokontany, 'quartier': quartier})
+    db.session.execute(text('DROP TABLE personne_convertie_v1'))
+    db.session.commit()
+
+# 📡 Diffusion des modifications en direct (Server-Sent Events)
+INTERVALLE_SONDAGE = 1.0
+DUREE_MAX_FLUX = 300  # le navigateur se reconnecte seul avec Last-Event-ID
+RETENTION_EVENEMENTS = timedelta(hours=1)
+
+def journaliser(type_evenement, donnees):
+    # Événement de la paroisse courante ; hors paroisse (archivage...), destiné à toutes
+    db.session.add(EvenementConverti(type=type_evenement, donnees=json.dumps(donnees),
+                                     paroisse_id=paroisse_courante()))
+
+def format_sse(evenement):
+    return f"id: {evenement['id']}\nevent: {evenement['type']}\ndata: {evenement['donnees']}\n\n"
+
+class DiffuseurEvenements:
+    # Un seul thread par worker sonde le journal SQLite et redistribue aux abonnés
+    # locaux : le coût ne dépend pas du nombre de pages ouvertes.
+    def __init__(self, intervalle=INTERVALLE_SONDAGE):
+        self.intervalle = intervalle
+        self.abonnes = set()
+        self.verrou = threading.Lock()
+        self.thread = None
+
+    def abonner(self):
+        file = queue.Queue(maxsize=1000)
+        with self.verrou:
+            self.abonnes.add(file)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._boucle, args=(current_app._get_current_object(),),
+                                               daemon=True)
+                self.thread.start()
+        return file
+
+    def desabonner(self, file):
+        with self.verrou:
+            self.abonnes.discard(file)
+
+    def _boucle(self, app):
+        try:
+            with app.app_context():
+                self._sonder()
+        except Exception:
+            app.logger.exception('Diffuseur SSE arrêté')
+        finally:
+            # Sortie sur erreur : le prochain abonné relance un thread
+            with self.verrou:
+                if self.thread is threading.current_thread():
+                    self.thread = None
+
+    def _sonder(self):
+        dernier_id = db.session.query(db.func.max(EvenementConverti.id)).scalar() or 0
+        prochaine_purge = time.monotonic()
+        while True:
+            time.sleep(self.intervalle)
+            with self.verrou:
+                if not self.abonnes:
+                    self.thread = None
+                    db.session.remove()
+                    return
+                abonnes = list(self.abonnes)
+            try:
+                # Copie en dictionnaires avant commit/remove : les objets ORM y seraient expirés
+                messages = [{'id': ev.id, 'type': ev.type, 'donnees': ev.donnees, 'paroisse_id': ev.paroisse_id}
+                            for ev in EvenementConverti.query
+                            .filter(EvenementConverti.id > dernier_id)
+                            .order_by(EvenementConverti.id).limit(500)]
+                if time.monotonic() >= prochaine_purge:
+                    EvenementConverti.query.filter(
+                        EvenementConverti.date < datetime.utcnow() - RETENTION_EVENEMENTS).delete()
+                    db.session.commit()
+                    prochaine_purge = time.monotonic() + 60
+            except Exception:
+                # Base momentanément indisponible : on réessaie au tour suivant
+                current_app.logger.exception('Échec du sondage des événements')
+                db.session.rollback()
+                messages = []
+            finally:
+                db.session.remove()
+            for message in messages:
+                dernier_id = message['id']
+                for file in abonnes:
+                    try:
+                        file.put_nowait(message)
+                    except queue.Full:
+                        # Client trop lent : on le coupe, il se reconnectera
+                        self.desabonner(file)
+
+diffuseur = DiffuseurEvenements()
+
+# 🗃️ Cache LRU des réponses sérialisées (par worker)
+TAILLE_CACHE = 512
+TTL_CACHE = 30  # borne le retard des autres workers, qui ne voient pas nos invalidations
+
+# 🔀 Coalescence (single-flight) : dans un worker, les requêtes identiques simultanées
+# attendent le calcul déjà en cours et repartent avec les mêmes octets sérialisés
+class CalculsEnCours:
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.en_cours = {}  # cle -> [événement, corps, exception]
+        self.compteurs = {'calculs': 0, 'partages': 0}
+
+    def executer(self, cle, calcul):
+        with self.verrou:
+            vol = self.en_cours.get(cle)
+            meneur = vol is None
+            if meneur:
+                vol = self.en_cours[cle] = [threading.Event(), None, None]
+                self.compteurs['calculs'] += 1
+            else:
+                self.compteurs['partages'] += 1
+        if not meneur:
+            vol[0].wait()  # coopératif sous gevent (threading patché)
+            if vol[2] is not None:
+                raise vol[2]
+            return vol[1]
+        try:
+            vol[1] = calcul()
+            return vol[1]
+        except Exception as e:
+            vol[2] = e
+            raise
+        finally:
+            with self.verrou:
+                del self.en_cours[cle]
+            vol[0].set()
+
+    def stats(self):
+        with self.verrou:
+            return dict(self.compteurs, en_cours=len(self.en_cours))
+
+calculs_en_cours = CalculsEnCours()
+
+# 🧬 Négociation de contenu : JSON par défaut, MessagePack ou CBOR si Accept le demande
+# (msgpack et cbor2 facultatifs : un format n'est proposé que si son module est installé)
+TYPES_CONTENU = {
+    'application/json': 'json',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+    'application/cbor': 'cbor',
+}
+MIMETYPES_FORMAT = {'json': 'application/json', 'msgpack': 'application/msgpack', 'cbor': 'application/cbor'}
+MODULES_FORMAT = {'msgpack': 'msgpack', 'cbor': 'cbor2'}
+CHAMPS_DATE = {'data_ajout', 'date_creation', 'date_fin'}  # texte UTC 'AAAA-MM-JJ HH:MM:SS' en JSON
+_modules_format = {}
+
+def module_format(format_):
+    if format_ not in _modules_format:
+        try:
+            _modules_format[format_] = importlib.import_module(MODULES_FORMAT[format_])
+        except ImportError:
+            _modules_format[format_] = None
+    return _modules_format[format_]
+
+def format_negocie():
+    # JSON en tête : il l'emporte à qualité égale (Accept absent ou */*)
+    proposes = [t for t, f in TYPES_CONTENU.items() if f == 'json' or module_format(f)]
+    return TYPES_CONTENU[request.accept_mimetypes.best_match(proposes, default='application/json')]
+
+def _dates_natives(valeur):
+    # Les champs date deviennent de vrais horodatages (extension -1 MessagePack, tag 1 CBOR).
+    # En place : les données viennent d'être calculées pour cette seule sérialisation.
+    if isinstance(valeur, list):
+        premier = valeur[0] if valeur else None
+        if isinstance(premier, dict) and not any(isinstance(v, (list, dict)) for v in premier.values()):
+            # Lignes à plat de même forme (to_dict, lignes_en_dicts) : seules les clés date sont visitées
+            for cle in CHAMPS_DATE.intersection(premier):
+                for ligne in valeur:
+                    if isinstance(ligne[cle], str):
+                        ligne[cle] = datetime.fromisoformat(ligne[cle] + '+00:00')
+        else:
+            for element in valeur:
+                _dates_natives(element)
+    elif isinstance(valeur, dict):
+        for cle, v in valeur.items():
+            if cle in CHAMPS_DATE and isinstance(v, str):
+                valeur[cle] = datetime.fromisoformat(v + '+00:00')  # plus rapide que replace(tzinfo=)
+            elif isinstance(v, (list, dict)):
+                _dates_natives(v)
+    return valeur
+
+def _dates_naives(valeur):
+    # Horodatages reçus -> datetime UTC naïf, comme en base
+    if isinstance(valeur, datetime) and valeur.tzinfo:
+        return valeur.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(valeur, list):
+        return [_dates_naives(v) for v in valeur]
+    if isinstance(valeur, dict):
+        return {cle: _dates_naives(v) for cle, v in valeur.items()}
+    return valeur
+
+def serialiser(donnees, format_):
+    if format_ == 'json':
+        return current_app.json.response(donnees).get_data()
+    if format_ == 'msgpack':
+        return module_format('msgpack').packb(_dates_natives(donnees), datetime=True)
+    return module_format('cbor').dumps(_dates_natives(donnees), datetime_as_timestamp=True)
+
+def reponse_negociee(corps, format_, statut=200):
+    reponse = Response(corps, status=statut, mimetype=MIMETYPES_FORMAT[format_])
+    reponse.vary.add('Accept')
+    return reponse
+
+def repondre(donnees, statut=200):
+    format_ = format_negocie()
+    return reponse_negociee(serialiser(donnees, format_), format_, statut)
+
+def donnees_requete(silent=False):
+    # Corps JSON, MessagePack ou CBOR selon Content-Type (mêmes règles que request.get_json)
+    format_ = TYPES_CONTENU.get(request.mimetype)
+    if format_ not in MODULES_FORMAT:
+        return request.get_json(silent=silent)
+    try:
+        if module_format(format_) is None:
+            raise UnsupportedMediaType(f'Format {request.mimetype} non pris en charge')
+        if format_ == 'msgpack':
+            return _dates_naives(module_format('msgpack').unpackb(request.get_data(), timestamp=3))
+        return _dates_naives(module_format('cbor').loads(request.get_data()))
+    except Exception as e:
+        if silent:
+            return None
+        raise e if isinstance(e, UnsupportedMediaType) else BadRequest(f'Corps {request.mimetype} illisible')
+
+class CacheReponses:
+    # Corps JSON déjà sérialisés, indexés par route + arguments. Chaque entrée porte
+    # des étiquettes (id, commune, inviteur) pour une invalidation ciblée.
+    def __init__(self, taille_max=TAILLE_CACHE, ttl=TTL_CACHE):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self.entrees = OrderedDict()  # cle -> (expiration, corps, etiquettes)
+        self.par_etiquette = defaultdict(set)
+        self.verrou = threading.Lock()
+        self.compteurs = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+        self.generation = 0  # change à chaque invalidation : un calcul commencé avant est périmé
+
+    def obtenir(self, cle):
+        with self.verrou:
+            entree = self.entrees.get(cle)
+            if entree is None or entree[0] < time.monotonic():
+                if entree is not None:
+                    self._retirer(cle)
+                self.compteurs['misses'] += 1
+                return None
+            self.entrees.move_to_end(cle)
+            self.compteurs['hits'] += 1
+            return entree[1]
+
+    def stocker(self, cle, corps, etiquettes):
+        with self.verrou:
+            if cle in self.entrees:
+                self._retirer(cle)
+            self.entrees[cle] = (time.monotonic() + self.ttl, corps, etiquettes)
+            for etiquette in etiquettes:
+                self.par_etiquette[etiquette].add(cle)
+            while len(self.entrees) > self.taille_max:
+                self._retirer(next(iter(self.entrees)))
+                self.compteurs['evictions'] += 1
+
+    def invalider(self, *etiquettes):
+        with self.verrou:
+            self.generation += 1
+            for etiquette in etiquettes:
+                for cle in self.par_etiquette.pop(etiquette, ()):
+                    if cle in self.entrees:
+                        self._retirer(cle)
+                        self.compteurs['invalidations'] += 1
+
+    def vider(self):
+        with self.verrou:
+            self.generation += 1
+            self.compteurs['invalidations'] += len(self.entrees)
+            self.entrees.clear()
+            self.par_etiquette.clear()
+
+    def _retirer(self, cle):
+        _, _, etiquettes = self.entrees.pop(cle)
+        for etiquette in etiquettes:
+            cles = self.par_etiquette.get(etiquette)
+            if cles is not None:
+                cles.discard(cle)
+                if not cles:
+                    del self.par_etiquette[etiquette]
+
+    def stats(self):
+        with self.verrou:
+            total = self.compteurs['hits'] + self.compteurs['misses']
+            return dict(self.compteurs, taille=len(self.entrees), taille_max=self.taille_max,
+                        ttl=self.ttl, ratio=round(self.compteurs['hits'] / total, 3) if total else None)
+
+cache_reponses = CacheReponses()
+
+def etiquettes_converti(id, commune_id, nom_inviteur):
+    return [('id', id), ('commune', commune_id), ('inviteur', nom_inviteur or '')]
+
+def reponse_en_cache(cle, etiquettes, calcul):
+    format_ = format_negocie()
+    cle = (cle, format_, paroisse_courante())
+    corps = cache_reponses.obtenir(cle)
+    if corps is None:
+        generation = cache_reponses.generation
+        corps = calculs_en_cours.executer((cle, generation), lambda: serialiser(calcul(), format_))
+        if cache_reponses.generation == generation:  # pas d'écriture pendant le calcul
+            cache_reponses.stocker(cle, corps, etiquettes)
+    return reponse_negociee(corps, format_)
+
+# 🗄️ Cache partagé entre workers (Redis si CACHE_URL=redis://..., sinon fichier SQLite local)
+TTL_CACHE_PARTAGE = 300
+DUREE_VERROU_CALCUL = 30
+ATTENTE_MAX_CALCUL = 10
+CLE_VERSION = 'version:convertis'  # globale ; suffixée :<paroisse> pour la version d'une paroisse
+
+# Seau à jetons et admissions en Lua : lecture et mise à jour atomiques côté Redis
+SCRIPT_SEAU = '''
+local cout, capacite, debit, maintenant = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local etat = redis.call('HMGET', KEYS[1], 'jetons', 'maj')
+local jetons = tonumber(etat[1]) or capacite
+jetons = math.min(capacite, jetons + (maintenant - (tonumber(etat[2]) or maintenant)) * debit)
+local accepte = 0
+if jetons >= cout then
+    jetons = jetons - cout
+    accepte = 1
+end
+redis.call('HSET', KEYS[1], 'jetons', tostring(jetons), 'maj', tostring(maintenant))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacite / debit) + 1)
+return {accepte, tostring(jetons)}
+'''
+SCRIPT_ADMISSION = '''
+local limite, ttl, maintenant = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', maintenant)
+if redis.call('ZCARD', KEYS[1]) >= limite then
+    return 0
+end
+redis.call('ZADD', KEYS[1], maintenant + ttl, ARGV[1])
+return 1
+'''
+
+class CacheRedis:
+    def __init__(self, url):
+        import redis  # dépendance optionnelle, seulement si CACHE_URL pointe vers Redis
+        self.client = redis.Redis.from_url(url)
+        self.script_seau = self.client.register_script(SCRIPT_SEAU)
+        self.script_admission = self.client.register_script(SCRIPT_ADMISSION)
+
+    def lire(self, cle):
+        return self.client.get(cle)
+
+    def ecrire(self, cle, valeur, ttl):
+        self.client.set(cle, valeur, ex=ttl)
+
+    def incrementer(self, cle):
+        return self.client.incr(cle)
+
+    def verrouiller(self, cle, ttl):
+        return bool(self.client.set(cle, b'1', nx=True, ex=ttl))
+
+    def liberer(self, cle):
+        self.client.delete(cle)
+
+    def consommer(self, cle, cout, capacite, debit):
+        accepte, jetons = self.script_seau(keys=[cle], args=[cout, capacite, debit, time.time()])
+        return bool(accepte), float(jetons)
+
+    def admettre(self, cle, jeton, limite, ttl):
+        return bool(self.script_admission(keys=[cle], args=[jeton, limite, ttl, time.time()]))
+
+    def sortir(self, cle, jeton):
+        self.client.zrem(cle, jeton)
+
+class CacheSQLite:
+    # Équivalent local de Redis : un fichier à part, pour ne pas disputer le verrou
+    # d'écriture de convertis.db. Une connexion par thread.
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.local = threading.local()
+
+    def _connexion(self):
+        # Ouverte au premier usage : aucune E/S à l'import du module
+        if not hasattr(self.local, 'conn'):
+            os.makedirs(os.path.dirname(self.chemin), exist_ok=True)
+            conn = sqlite3.connect(self.chemin, timeout=ATTENTE_VERROU_C / 1000, isolation_level=None,
+                                   factory=ConnexionCooperative)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # un cache perdu se recalcule
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (cle TEXT PRIMARY KEY, valeur BLOB, expire REAL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS seaux (cle TEXT PRIMARY KEY, jetons REAL, maj REAL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS admissions '
+                         '(cle TEXT, jeton TEXT, expire REAL, PRIMARY KEY (cle, jeton))')
+            self.local.conn = conn
+        return self.local.conn
+
+    def lire(self, cle):
+        ligne = self._connexion().execute(
+            'SELECT valeur FROM cache WHERE cle = ? AND (expire IS NULL OR expire > ?)',
+            (cle, time.time())).fetchone()
+        return ligne[0] if ligne else None
+
+    def ecrire(self, cle, valeur, ttl):
+        conn = self._connexion()
+        conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', (cle, valeur, time.time() + ttl))
+        conn.execute('DELETE FROM cache WHERE expire < ?', (time.time(),))
+
+    def incrementer(self, cle):
+        # Une seule instruction : atomique entre processus
+        return self._connexion().execute(
+            'INSERT INTO cache VALUES (?, 1, NULL) '
+            'ON CONFLICT(cle) DO UPDATE SET valeur = valeur + 1 RETURNING valeur', (cle,)).fetchone()[0]
+
+    def verrouiller(self, cle, ttl):
+        conn = self._connexion()
+        maintenant = time.time()
+        conn.execute('DELETE FROM cache WHERE cle = ? AND expire < ?', (cle, maintenant))
+        return conn.execute('INSERT OR IGNORE INTO cache VALUES (?, 1, ?)',
+                            (cle, maintenant + ttl)).rowcount == 1
+
+    def liberer(self, cle):
+        self._connexion().execute('DELETE FROM cache WHERE cle = ?', (cle,))
+
+    def consommer(self, cle, cout, capacite, debit):
+        conn = self._connexion()
+        maintenant = time.time()
+        with conn:  # BEGIN IMMEDIATE : lecture et écriture sans autre worker entre les deux
+            conn.execute('BEGIN IMMEDIATE')
+            ligne = conn.execute('SELECT jetons, maj FROM seaux WHERE cle = ?', (cle,)).fetchone()
+            jetons = capacite if ligne is None else min(capacite, ligne[0] + (maintenant - ligne[1]) * debit)
+            accepte = jetons >= cout
+            if accepte:
+                jetons -= cout
+            conn.execute('INSERT OR REPLACE INTO seaux VALUES (?, ?, ?)', (cle, jetons, maintenant))
+            if random.random() < 0.01:
+                # Un seau plein depuis longtemps équivaut à une absence de ligne
+                conn.execute('DELETE FROM seaux WHERE maj < ?', (maintenant - capacite / debit,))
+        return accepte, jetons
+
+    def admettre(self, cle, jeton, limite, ttl):
+        conn = self._connexion()
+        maintenant = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM admissions WHERE cle = ? AND expire < ?', (cle, maintenant))
+            (occupees,) = conn.execute('SELECT COUNT(*) FROM admissions WHERE cle = ?', (cle,)).fetchone()
+            if occupees >= limite:
+                return False
+            conn.execute('INSERT INTO admissions VALUES (?, ?, ?)', (cle, jeton, maintenant + ttl))
+        return True
+
+    def sortir(self, cle, jeton):
+        self._connexion().execute('DELETE FROM admissions WHERE cle = ? AND jeton = ?', (cle, jeton))
+
+def creer_cache_partage(app):
+    url = app.config['CACHE_URL']
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        return CacheRedis(url)
+    return CacheSQLite(url or os.path.join(app.instance_path, 'cache.db'))
+
+def cache_partage():
+    return current_app.extensions['cache_partage']
+
+def version_donnees():
+    # Version globale (lieux, archivage) suivie de celle de la paroisse courante :
+    # une écriture dans une paroisse ne périme pas les entrées des autres
+    globale = int(cache_partage().lire(CLE_VERSION) or 0)
+    paroisse = paroisse_courante()
+    if paroisse is None:
+        return f'{globale}'
+    return f"{globale}.{int(cache_partage().lire(f'{CLE_VERSION}:{paroisse}') or 0)}"
+
+def reponse_partagee(nom, calcul, ttl=TTL_CACHE_PARTAGE):
+    # Clé versionnée : une écriture change la version, les anciennes entrées expirent seules
+    format_ = format_negocie()
+    cle = f'{nom}:{format_}:p{paroisse_courante()}:v{version_donnees()}'
+    corps = cache_partage().lire(cle)
+    if corps is None:
+        # Un seul greenlet par worker va chercher ou calculer, les autres partagent ses octets
+        corps = calculs_en_cours.executer(cle, lambda: _lire_ou_calculer_partage(
+            cle, lambda: serialiser(calcul(), format_), ttl))
+    return reponse_negociee(corps, format_)
+
+def _lire_ou_calculer_partage(cle, calcul, ttl):
+    corps = cache_partage().lire(cle)
+    if corps is not None:
+        return corps
+    # Anti-ruée entre workers : un seul calcule, les autres attendent son résultat
+    if cache_partage().verrouiller(f'verrou:{cle}', DUREE_VERROU_CALCUL):
+        try:
+            corps = calcul()
+            cache_partage().ecrire(cle, corps, ttl)
+        finally:
+            cache_partage().liberer(f'verrou:{cle}')
+        return corps
+    fin = time.monotonic() + ATTENTE_MAX_CALCUL
+    while corps is None and time.monotonic() < fin:
+        time.sleep(0.05)
+        corps = cache_partage().lire(cle)
+    return corps if corps is not None else calcul()
+
+def invalider_caches(*etiquettes):
+    # Après une écriture : invalidation ciblée locale, nouvelle version partagée de la paroisse
+    cache_reponses.invalider(*etiquettes)
+    paroisse = paroisse_courante()
+    cache_partage().incrementer(CLE_VERSION if paroisse is None else f'{CLE_VERSION}:{paroisse}')
+
+# 🚦 Limitation de débit par client et contrôle d'admission (état dans le cache partagé)
+# Coût en jetons par route : une liste complète ou un export pèse bien plus qu'un GET par id
+# (nom de la vue : mêmes coûts avec ou sans préfixe /paroisses/<cle>)
+COUTS_REQUETE = {
+    'lister_convertis': 10,
+    'exporter_convertis': 50,
+    'importer_convertis': 20,
+    'interroger_convertis': 5,
+    'rechercher_doublons': 5,
+    'statistiques_convertis': 5,
+    'obtenir_convertis_par_lot': 5,
+    'supprimer_convertis': 5,
+    'ajouter_converti': 3,
+    'get_unique_values': 3,
+    'carte_convertis': 3,
+    'serie_temporelle': 2,
+    'telecharger_sauvegarde': 50,
+}
+# Routes lourdes soumises au plafond global de requêtes simultanées (tous workers confondus),
+# et à un plafond par paroisse : une grosse paroisse ne prend pas toutes les places
+ROUTES_COUTEUSES = {'lister_convertis', 'exporter_convertis', 'importer_convertis',
+                    'interroger_convertis', 'rechercher_doublons', 'statistiques_convertis',
+                    'telecharger_sauvegarde'}
+CLE_ADMISSIONS = 'admissions:couteuses'
+DUREE_ADMISSION = 300  # une place non rendue (worker tué) se libère seule
+
+def identifiant_client():
+    # Dernière adresse de X-Forwarded-For : celle vue par le proxy de Render, non falsifiable
+    return request.access_route[-1] if request.access_route else 'inconnu'
+
+def refus(message, statut, attente):
+    reponse = jsonify({'error': message})
+    reponse.status_code = statut
+    reponse.headers['Retry-After'] = str(max(1, int(attente + 0.999)))
+    return reponse
+
+@bp.before_app_request
+def limiter_debit():
+    capacite, debit = current_app.config['LIMITE_JETONS'], current_app.config['LIMITE_DEBIT']
+    if not capacite or request.method == 'OPTIONS' or request.endpoint not in current_app.view_functions:
+        return None
+    vue = request.endpoint.rpartition('.')[2]
+    cout = min(COUTS_REQUETE.get(vue, 1), capacite)
+    accepte, jetons = cache_partage().consommer(f'seau:{identifiant_client()}', cout, capacite, debit)
+    if not accepte:
+        return refus('Trop de requêtes, réessayez plus tard', 429, (cout - jetons) / debit)
+
+    if vue in ROUTES_COUTEUSES:
+        jeton = f'{os.getpid()}:{random.getrandbits(64):x}'
+        # Place de la paroisse d'abord : une paroisse à son plafond n'occupe pas de place globale
+        places = [(CLE_ADMISSIONS, current_app.config['LIMITE_CONCURRENCE'])]
+        if paroisse_courante() is not None:  # routes d'administration : place globale seule
+            places.insert(0, (f'{CLE_ADMISSIONS}:{paroisse_courante()}',
+                              current_app.config['LIMITE_CONCURRENCE_PAROISSE']))
+        obtenues = []
+        for cle, limite in places:
+            if not cache_partage().admettre(cle, jeton, limite, DUREE_ADMISSION):
+                for cle_obtenue in obtenues:
+                    cache_partage().sortir(cle_obtenue, jeton)
+                return refus('Serveur saturé, réessayez dans un instant', 503, 1 + random.random() * 2)
+            obtenues.append(cle)
+        request.environ['convertis.admission'] = (jeton, obtenues)
+    return None
+
+@bp.teardown_app_request
+def rendre_admission(exc):
+    # Après la fin du flux pour les réponses en streaming (stream_with_context)
+    admission = request.environ.pop('convertis.admission', None)
+    if admission:
+        jeton, cles = admission
+        for cle in cles:
+            cache_partage().sortir(cle, jeton)
+
+# 🧹 Tâches de maintenance planifiées (purge, vacuum...)
+HEURES_CREUSES_UTC = {22, 23, 0, 1, 2}  # 1h-5h à Madagascar
+RETENTION_SUPPRESSIONS = timedelta(days=7)  # délai de visibilité des suppressions logiques
+TAILLE_LOT_SUPPRESSION = 500
+PAGES_PAR_VACUUM = 1000
+
+def prendre_verrou(nom, duree):
+    # Un seul worker obtient le bail tant qu'il n'a pas expiré
+    maintenant = datetime.utcnow()
+    try:
+        with db.session.begin_nested():
+            db.session.add(VerrouMaintenance(nom=nom, expire_le=maintenant + duree))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        pass
+    pris = (VerrouMaintenance.query
+            .filter(VerrouMaintenance.nom == nom, VerrouMaintenance.expire_le < maintenant)
+            .update({'expire_le': maintenant + duree}))
+    db.session.commit()
+    return pris == 1
+
+class Planificateur:
+    # Thread léger démarré par chaque worker ; le bail en base garantit
+    # qu'une tâche ne tourne que dans un seul worker par intervalle.
+    def __init__(self):
+        self.taches = []
+        self.verrou = threading.Lock()
+        self.thread = None
+
+    def tache(self, intervalle, heures_creuses=False):
+        def enregistrer(fonction):
+            self.taches.append((fonction, intervalle, heures_creuses))
+            return fonction
+        return enregistrer
+
+    def demarrer(self, app):
+        with self.verrou:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._boucle, args=(app,), daemon=True)
+                self.thread.start()
+
+    def _boucle(self, app):
+        while True:
+            time.sleep(60)
+            for fonction, intervalle, heures_creuses in self.taches:
+                if heures_creuses and datetime.utcnow().hour not in HEURES_CREUSES_UTC:
+                    continue
+                with app.app_context():
+                    try:
+                        if prendre_verrou(fonction.__name__, intervalle):
+                            fonction()
+                    except Exception:
+                        current_app.logger.exception('Échec de la tâche %s', fonction.__name__)
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+
+planificateur = Planificateur()
+
+@bp.before_app_request
+def demarrer_planificateur():
+    # Au premier appel plutôt qu'au démarrage : aucun thread avant le fork des workers
+    planificateur.demarrer(current_app._get_current_object())
+
+def supprimer_par_lots(ids, definitif=True):
+    # Petites transactions successives : les autres requêtes passent entre deux lots
+    total = 0
+    for i in range(0, len(ids), TAILLE_LOT_SUPPRESSION):
+        # Les ids d'une autre paroisse sont ignorés
+        touches = (convertis_paroisse(ids[i:i + TAILLE_LOT_SUPPRESSION])
+                   .with_entities(PersonneConvertie.id, PersonneConvertie.commune_id,
+                                  PersonneConvertie.nom_inviteur).all())
+        lot = [ligne[0] for ligne in touches]
+        if not lot:
+            continue
+        # Seules les inscriptions encore actives sont dans les compteurs (pas celles purgées)
+        compter_inscriptions(convertis_actifs(lot).with_entities(
+            PersonneConvertie.paroisse_id, PersonneConvertie.date_ajout, PersonneConvertie.commune_id), -1)
+        if definitif:
+            TrigrammeNom.query.filter(TrigrammeNom.personne_id.in_(lot)).delete()
+            total += PersonneConvertie.query.filter(PersonneConvertie.id.in_(lot)).delete()
+        else:
+            total += convertis_actifs(lot).update({'supprime_le': datetime.utcnow()})
+        journaliser('delete', {'ids': lot})
+        db.session.commit()
+        invalider_caches(*(e for ligne in touches for e in etiquettes_converti(*ligne)))
+        time.sleep(0)
+    return total
+
+@planificateur.tache(timedelta(hours=1), heures_creuses=True)
+def purger_supprimes():
+    limite = datetime.utcnow() - RETENTION_SUPPRESSIONS
+    while True:
+        ids = [i for (i,) in db.session.query(PersonneConvertie.id)
+               .filter(PersonneConvertie.supprime_le < limite)
+               .limit(TAILLE_LOT_SUPPRESSION)]
+        if not ids:
+            break
+        TrigrammeNom.query.filter(TrigrammeNom.personne_id.in_(ids)).delete()
+        PersonneConvertie.query.filter(PersonneConvertie.id.in_(ids)).delete()
+        db.session.commit()
+        time.sleep(0.001)  # vraie pause : sous gevent, sleep(0) ne fait pas tourner la boucle d'E/S
+    thread_systeme(_vacuum_incremental, db.engine.url.database)()
+
+def _vacuum_incremental(chemin):
+    # Rend les pages libérées au système par petites étapes (verrou d'écriture bref).
+    # Thread système (thread_systeme) : attente du verrou et vacuum ne figent pas le worker.
+    dormir = sommeil_systeme()
+    conn = sqlite3.connect(chemin, timeout=30, isolation_level=None)
+    try:
+        libres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        while libres:
+            # sqlite3 n'avance l'instruction que d'un pas, soit une page : N pas par transaction
+            conn.execute('BEGIN IMMEDIATE')
+            for _ in range(min(libres, PAGES_PAR_VACUUM)):
+                conn.execute('PRAGMA incremental_vacuum')
+            conn.execute('COMMIT')
+            restantes = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if restantes >= libres:
+                break  # auto_vacuum inactif : rien à rendre
+            libres = restantes
+            dormir(0.1)
+    finally:
+        conn.close()
+
+def activer_vacuum_incremental():
+    # auto_vacuum ne s'applique à une base existante qu'après un VACUUM complet (une seule fois)
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+            conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.exec_driver_sql('VACUUM')
+
+# 🗂️ Archivage : les inscriptions anciennes quittent la table chaude pour une table par année
+AGE_ARCHIVAGE = timedelta(days=2 * 365)
+TAILLE_LOT_ARCHIVAGE = 1000
+PREFIXE_ARCHIVE = 'personne_convertie_archive_'
+
+def _colonnes_archive():
+    return [
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('paroisse_id', db.Integer, nullable=False),
+        db.Column('nom', db.String(100), nullable=False),
+        db.Column('prenom', db.String(100), nullable=False),
+        db.Column('telephone', db.String(20)),
+        db.Column('commune_id', db.Integer, nullable=False),
+        db.Column('fokontany_id', db.Integer, nullable=False),
+        db.Column('quartier_id', db.Integer),
+        db.Column('nom_inviteur', db.String(100)),
+        db.Column('date_ajout', db.DateTime),
+    ]
+
+# Hors de db.metadata : create_all() ne crée ni les archives ni la vue
+metadonnees_archives = db.MetaData()
+vue_convertis_tous = db.Table('convertis_tous', metadonnees_archives, *_colonnes_archive())
+
+def table_archive(annee):
+    nom = f'{PREFIXE_ARCHIVE}{annee}'
+    if nom in metadonnees_archives.tables:
+        return metadonnees_archives.tables[nom]
+    return db.Table(nom, metadonnees_archives, *_colonnes_archive(),
+                    db.Index(f'ix_{nom}_paroisse_commune', 'paroisse_id', 'commune_id'))
+
+def creer_vue_convertis_tous():
+    # Vue d'union (table chaude + archives) pour les exports
+    colonnes = ', '.join(c.name for c in vue_convertis_tous.c)
+    selections = [f'SELECT {colonnes} FROM personne_convertie WHERE supprime_le IS NULL']
+    selections += [f'SELECT {colonnes} FROM {nom}' for nom in sorted(inspect(db.engine).get_table_names())
+                   if nom.startswith(PREFIXE_ARCHIVE)]
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP VIEW IF EXISTS convertis_tous'))
+        conn.execute(text('CREATE VIEW convertis_tous AS ' + ' UNION ALL '.join(selections)))
+
+def _archiver_lot(chemin, dialecte, limite, id_max):
+    # Un lot : copie vers les tables annuelles puis suppression, dans une même transaction.
+    # Thread système (thread_systeme) : attente du verrou et écritures ne figent pas le worker.
+    colonnes = ', '.join(c.name for c in vue_convertis_tous.c)
+    conn = sqlite3.connect(chemin, timeout=30, isolation_level=None)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        lignes = conn.execute(
+            "SELECT id, strftime('%Y', date_ajout) FROM personne_convertie "
+            'WHERE date_ajout < ? AND supprime_le IS NULL AND id < ? ORDER BY id LIMIT ?',
+            (limite.isoformat(' '), id_max, TAILLE_LOT_ARCHIVAGE)).fetchall()
+        par_annee = defaultdict(list)
+        for id, annee in lignes:
+            par_annee[int(annee)].append(id)
+        for annee, ids in par_annee.items():
+            table = table_archive(annee)
+            conn.execute(str(CreateTable(table, if_not_exists=True).compile(dialect=dialecte)))
+            for index in table.indexes:
+                conn.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialecte)))
+            conn.execute(f'INSERT INTO {table.name} ({colonnes}) SELECT {colonnes} FROM personne_convertie '
+                         f"WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        ids = [id for id, _ in lignes]
+        marques = ', '.join('?' * len(ids))
+        if ids:
+            conn.execute(f'DELETE FROM trigramme_nom WHERE personne_id IN ({marques})', ids)
+            conn.execute(f'DELETE FROM personne_convertie WHERE id IN ({marques})', ids)
+        conn.execute('COMMIT')
+        return len(ids)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+@planificateur.tache(timedelta(days=1), heures_creuses=True)
+def archiver_anciens():
+    limite = datetime.utcnow() - AGE_ARCHIVAGE
+    # Le plus grand id reste dans la table chaude : SQLite ne réattribuera pas d'id archivé
+    id_max = db.session.query(db.func.max(PersonneConvertie.id)).scalar() or 0
+    db.session.commit()  # pas de transaction de lecture ouverte pendant les lots
+    deplaces = 0
+    while True:
+        lot = thread_systeme(_archiver_lot, db.engine.url.database, db.engine.dialect, limite, id_max)()
+        if not lot:
+            break
+        deplaces += lot
+    if deplaces:
+        creer_vue_convertis_tous()
+        journaliser('reset', {})
+        db.session.commit()
+        cache_reponses.vider()
+        cache_partage().incrementer(CLE_VERSION)
+    return deplaces
+
+# Création de la base : via `flask initialiser-base` (lancé par gunicorn.conf.py avant
+# les workers), jamais à l'import, pour que les workers démarrent sans E/S
+def initialiser_base():
     db.create_all()
+    migrer_lieux()
+    ajouter_colonnes_manquantes(PersonneConvertie)
+    ajouter_colonnes_manquantes(Fokontany)
+    ajouter_colonnes_manquantes(TacheImport)
+    ajouter_colonnes_manquantes(EvenementConverti)
+    migrer_paroisses()
+    migrer_index_noms()
+    migrer_recherche_floue()
+    normaliser_inviteurs()
+    activer_vacuum_incremental()
+    creer_vue_convertis_tous()
+    if not db.session.query(CompteurJour.query.exists()).scalar():
+        reconstruire_compteurs()
+
+# ✅ Validation et normalisation, communes à POST /convertis et à l'import.
+# Expressions compilées et règles construites une fois, à l'import du module.
+CHAMPS_REQUIS = ['nom', 'prenom', 'commune', 'fokontany']  # nom_inviteur n'est pas requis
+RE_CONTROLE = re.compile(r'[\x00-\x1f\x7f]')
+RE_ESPACES = re.compile(r'\s+')
+RE_SEPARATEURS_TELEPHONE = re.compile(r'[\s.\-/()]+')
+# Mobiles 032/033/034/037/038/039 et fixes 020, avec ou sans +261 / 00261 / 0 initial
+RE_TELEPHONE = re.compile(r'(?:\+261|00261|261|0)?(3[234789]|20)(\d{7})')
+# Longueurs maximales alignées sur les colonnes
+LONGUEURS_MAX = {
+    'nom': PersonneConvertie.nom.type.length,
+    'prenom': PersonneConvertie.prenom.type.length,
+    'telephone': PersonneConvertie.telephone.type.length,
+    'nom_inviteur': PersonneConvertie.nom_inviteur.type.length,
+    'commune': Commune.nom.type.length,
+    'fokontany': Fokontany.nom.type.length,
+    'quartier': Quartier.nom.type.length,
+}
+
+def _texte(valeur):
+    return RE_ESPACES.sub(' ', RE_CONTROLE.sub('', str(valeur))).strip()
+
+def _nom_propre(valeur):
+    # "RAKOTO" ou "rakoto" -> "Rakoto" ; une casse mixte saisie à dessein est conservée
+    texte = _texte(valeur)
+    return texte.title() if texte.isupper() or texte.islower() else texte
+
+def _telephone(valeur):
+    # Forme canonique à 10 chiffres : 0341234567
+    correspondance = RE_TELEPHONE.fullmatch(RE_SEPARATEURS_TELEPHONE.sub('', str(valeur)))
+    if correspondance is None:
+        raise ValueError(f'Numéro de téléphone invalide : {valeur}')
+    return '0' + correspondance.group(1) + correspondance.group(2)
+
+REGLES_CONVERTI = [
+    ('nom', _nom_propre),
+    ('prenom', _nom_propre),
+    ('telephone', _telephone),
+    ('commune', _texte),
+    ('fokontany', _texte),
+    ('quartier', _texte),
+    ('nom_inviteur', _nom_propre),
+]
+
+def normaliser_converti(data):
+    # Retourne (ligne normalisée, None) ou (None, message d'erreur)
+    if not isinstance(data, dict):
+        return None, 'Le corps doit être un objet'
+    ligne = {}
+    for champ, normaliser in REGLES_CONVERTI:
+        valeur = data.get(champ)
+        try:
+            valeur = normaliser(valeur) if valeur not in (None, '') else ''
+        except ValueError as e:
+            return None, str(e)
+        if len(valeur) > LONGUEURS_MAX[champ]:
+            return None, f'Le champ {champ} dépasse {LONGUEURS_MAX[champ]} caractères'
+        ligne[champ] = valeur
+    for champ in CHAMPS_REQUIS:
+        if not ligne[champ]:
+            return None, f'Le champ {champ} est requis'
+
+    date_ajout = data.get('date_ajout')
+    if date_ajout in (None, ''):
+        ligne['date_ajout'] = None
+    else:
+        try:
+            ligne['date_ajout'] = date_ajout if isinstance(date_ajout, datetime) else _date(str(date_ajout).strip())
+            ligne['date_ajout'] = _dates_naives(ligne['date_ajout'])  # avec décalage -> UTC naïf, comme en base
+        except ValueError:
+            return None, 'Le champ date_ajout doit être une date ISO (AAAA-MM-JJ HH:MM:SS)'
+        if ligne['date_ajout'] > datetime.utcnow() + timedelta(days=1):
+            return None, 'Le champ date_ajout est dans le futur'
+    return ligne, None
+
+def nouveau_converti(ligne, lieux, paroisse_id):
+    # ligne : sortie de normaliser_converti
+    commune_id, fokontany_id, quartier_id = lieux
+    return PersonneConvertie(
+        paroisse_id=paroisse_id,
+        nom=ligne['nom'],
+        prenom=ligne['prenom'],
+        telephone=ligne['telephone'],
+        commune_id=commune_id,
+        fokontany_id=fokontany_id,
+        quartier_id=quartier_id,
+        nom_inviteur=ligne['nom_inviteur'],
+        date_ajout=ligne['date_ajout']  # None : date du serveur
+    )
 
 # ➕ Ajouter une personne convertie
-@app.route('/convertis', methods=['POST'])
+@bp.route('/convertis', methods=['POST'])
 def ajouter_converti():
-    data = request.get_json()
-    
-    # Add validation for required fields (nom_inviteur removed from required fields)
-    required_fields = ['nom', 'prenom', 'commune', 'fokontany']
-    for field in required_fields:
-        if field not in data or not data[field]:
-            return jsonify({'error': f'Le champ {field} est requis'}), 400
-    
-    personne = PersonneConvertie(
-        nom=data['nom'],
-        prenom=data['prenom'],
-        telephone=data.get('telephone', ''),
-        commune=data['commune'],
-        fokontany=data['fokontany'],
-        quartier=data.get('quartier', ''),
-        nom_inviteur=data.get('nom_inviteur', ''),  # Default to empty string if not provided
-        date_ajout=data.get('date_ajout', None)  # Optional field, can be None
-    )
+    data, erreur = normaliser_converti(donnees_requete())
+    if erreur:
+        return jsonify({'error': erreur}), 400
+
+    personne = nouveau_converti(data, resoudre_lieux(data['commune'], data['fokontany'], data['quartier']),
+                                paroisse_courante())
+    # Doublons probables, signalés avant l'insertion sans la bloquer
+    doublons = chercher_doublons(personne.nom, personne.prenom, limite=5)
     db.session.add(personne)
+    indexer_noms([personne])
+    compter_inscriptions([(personne.paroisse_id, personne.date_ajout, personne.commune_id)])
+    journaliser('insert', personne.to_dict())
+    db.session.commit()
+    invalider_caches(*etiquettes_converti(personne.id, personne.commune_id, personne.nom_inviteur))
+    return jsonify({
+        'message': 'Personne enregistrée avec succès',
+        'id': personne.id,
+        'doublons_possibles': doublons
+    }), 201
+
+# 📥 Import en masse CSV/XLSX, traité en arrière-plan par lots
+TAILLE_LOT_IMPORT = 500
+DELAI_IMPORT_ORPHELIN = timedelta(minutes=2)  # sans lot validé depuis : thread présumé mort
+MAX_ERREURS_RAPPORTEES = 1000
+EXTENSIONS_IMPORT = ('.csv', '.xlsx')
+
+def _entete(valeur):
+    # "Prénom" -> prenom, "Nom Inviteur" -> nom_inviteur
+    return cle_lieu(str(valeur or '')).replace(' ', '_')
+
+def lire_lignes(chemin, extension):
+    # Générateur de dictionnaires, une ligne à la fois : le fichier n'est jamais chargé en entier
+    if extension == '.xlsx':
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("Le module openpyxl est requis pour importer des fichiers XLSX")
+        classeur = load_workbook(chemin, read_only=True, data_only=True)
+        try:
+            lignes = classeur.active.iter_rows(values_only=True)
+            entetes = [_entete(c) for c in next(lignes, ())]
+            for ligne in lignes:
+                yield {e: '' if v is None else str(v).strip() for e, v in zip(entetes, ligne)}
+        finally:
+            classeur.close()
+    else:
+        with open(chemin, newline='', encoding='utf-8-sig') as f:
+            try:
+                dialecte = csv.Sniffer().sniff(f.read(4096), delimiters=',;\t')
+            except csv.Error:
+                dialecte = csv.excel
+            f.seek(0)
+            lecteur = csv.reader(f, dialecte)
+            entetes = [_entete(c) for c in next(lecteur, [])]
+            for ligne in lecteur:
+                yield {e: v.strip() for e, v in zip(entetes, ligne)}
+
+def nouvel_executant():
+    return f'{os.getpid()}:{random.getrandbits(32):x}'
+
+def _mettre_a_jour_tache(tache_id, proprietaire, **champs):
+    # Seul le thread propriétaire écrit : faux si la tâche a été reprise par un autre entre-temps
+    return TacheImport.query.filter_by(id=tache_id, executant=proprietaire).update(
+        dict(champs, maj_le=datetime.utcnow())) == 1
+
+def _inserer_lot(tache_id, executant, lot, progression, erreurs, numero):
+    # Lot, progression, erreurs et point de reprise dans une même transaction
+    if lot:
+        db.session.add_all(lot)
+        indexer_noms(lot)
+        compter_inscriptions([(p.paroisse_id, p.date_ajout, p.commune_id) for p in lot])
+    if not _mettre_a_jour_tache(tache_id, executant, derniere_ligne=numero, erreurs=json.dumps(erreurs),
+                                lignes_inserees=progression['lignes_inserees'] + len(lot),
+                                lignes_lues=progression['lignes_lues'], nb_erreurs=progression['nb_erreurs']):
+        db.session.rollback()
+        return False
+    db.session.commit()
+    progression['lignes_inserees'] += len(lot)
+    if lot:
+        invalider_caches(*(e for p in lot for e in etiquettes_converti(p.id, p.commune_id, p.nom_inviteur)))
+    time.sleep(0)  # laisse la main aux autres greenlets entre deux lots
+    return True
+
+def executer_import(app, tache_id, executant):
+    with app.app_context():
+        tache = db.session.get(TacheImport, tache_id)
+        g.paroisse_id = tache.paroisse_id  # caches, compteurs et événements de cette paroisse
+        chemin, reprise = tache.chemin, tache.derniere_ligne
+        progression = {'lignes_lues': tache.lignes_lues, 'lignes_inserees': tache.lignes_inserees,
+                       'nb_erreurs': tache.nb_erreurs}
+        erreurs, lieux, lot = json.loads(tache.erreurs), {}, []
+        if not _mettre_a_jour_tache(tache_id, executant, statut='en_cours'):
+            db.session.rollback()
+            db.session.remove()
+            return
+        db.session.commit()
+        final = {'statut': 'termine'}
+        try:
+            numero = reprise
+            for numero, ligne in enumerate(lire_lignes(chemin, os.path.splitext(chemin)[1].lower()), start=2):
+                if numero <= reprise or not any(ligne.values()):
+                    continue  # déjà validée avant une reprise, ou vide
+                progression['lignes_lues'] += 1
+                ligne, erreur = normaliser_converti(ligne)
+                if erreur:
+                    progression['nb_erreurs'] += 1
+                    if len(erreurs) < MAX_ERREURS_RAPPORTEES:
+                        erreurs.append({'ligne': numero, 'erreur': erreur})
+                else:
+                    cle = (ligne['commune'], ligne['fokontany'], ligne['quartier'])
+                    if cle not in lieux:
+                        lieux[cle] = resoudre_lieux(*cle)
+                    lot.append(nouveau_converti(ligne, lieux[cle], tache.paroisse_id))
+                # Validation toutes les TAILLE_LOT_IMPORT lignes lues, même sans ligne valide
+                if progression['lignes_lues'] % TAILLE_LOT_IMPORT == 0:
+                    if not _inserer_lot(tache_id, executant, lot, progression, erreurs, numero):
+                        return  # reprise par un autre thread : on lui laisse la tâche
+                    lot = []
+            if not _inserer_lot(tache_id, executant, lot, progression, erreurs, numero):
+                return
+        except Exception as e:
+            db.session.rollback()
+            final = {'statut': 'echec', 'message': str(e)}
+        finally:
+            db.session.rollback()  # rien en attente après un return anticipé
+            if _mettre_a_jour_tache(tache_id, executant, date_fin=datetime.utcnow(), executant=None, **final):
+                if progression['lignes_inserees']:
+                    journaliser('reset', {})  # les pages ouvertes rechargent la liste une seule fois
+                db.session.commit()
+                os.remove(chemin)
+            db.session.remove()
+
+def reprendre_si_orphelin(tache):
+    # Sans nouveau lot depuis DELAI_IMPORT_ORPHELIN, le thread est mort (worker recyclé,
+    # redéploiement) : reprise à la dernière ligne validée si la copie temporaire est encore
+    # sur cette instance, échec sinon. Vrai si la tâche a changé.
+    if tache.statut not in ('en_attente', 'en_cours'):
+        return False
+    if (tache.maj_le or tache.date_creation) > datetime.utcnow() - DELAI_IMPORT_ORPHELIN:
+        return False
+    reprise = bool(tache.chemin) and os.path.exists(tache.chemin)
+    executant = nouvel_executant()
+    champs = {'executant': executant} if reprise else {
+        'statut': 'echec', 'executant': None, 'date_fin': datetime.utcnow(),
+        'message': 'Import interrompu (worker arrêté) et fichier temporaire introuvable : à relancer'}
+    # Prise conditionnelle : un seul worker reprend la tâche
+    prise = (TacheImport.query
+             .filter(TacheImport.id == tache.id, TacheImport.executant.is_not_distinct_from(tache.executant),
+                     TacheImport.maj_le.is_not_distinct_from(tache.maj_le))
+             .update(dict(champs, maj_le=datetime.utcnow()), synchronize_session=False)) == 1
     db.session.commit()
-    return jsonify({'message': 'Personne enregistrée avec succès', 'id': personne.id}), 201
+    if prise and reprise:
+        threading.Thread(target=executer_import, args=(current_app._get_current_object(), tache.id, executant),
+                         daemon=True).start()
+    return prise
+
+@planificateur.tache(timedelta(minutes=1))
+def reprendre_imports():
+    for tache in TacheImport.query.filter(TacheImport.statut.in_(('en_attente', 'en_cours'))).all():
+        reprendre_si_orphelin(tache)
+
+@bp.route('/convertis/import', methods=['POST'])
+def importer_convertis():
+    fichier = request.files.get('fichier')
+    if fichier is None or not fichier.filename:
+        return jsonify({'error': 'Le fichier est requis'}), 400
+    extension = os.path.splitext(fichier.filename)[1].lower()
+    if extension not in EXTENSIONS_IMPORT:
+        return jsonify({'error': 'Seuls les fichiers CSV et XLSX sont acceptés'}), 400
+
+    # Copie sur disque par blocs, puis traitement hors de la requête
+    descripteur, chemin = tempfile.mkstemp(suffix=extension)
+    os.close(descripteur)
+    fichier.save(chemin)
+    executant = nouvel_executant()
+    tache = TacheImport(fichier=fichier.filename[:255], paroisse_id=paroisse_courante(), chemin=chemin,
+                        executant=executant, maj_le=datetime.utcnow())
+    db.session.add(tache)
+    db.session.commit()
+    threading.Thread(target=executer_import, args=(current_app._get_current_object(), tache.id, executant),
+                     daemon=True).start()
+    return jsonify(tache.to_dict()), 202
+
+@bp.route('/convertis/import/<int:id>', methods=['GET'])
+def statut_import(id):
+    tache = TacheImport.query.filter_by(id=id, paroisse_id=paroisse_courante()).first_or_404()
+    if reprendre_si_orphelin(tache):
+        db.session.refresh(tache)
+    return repondre(tache.to_dict())
 
 # 📃 Lister tous les convertis
-@app.route('/convertis', methods=['GET'])
+@bp.route('/convertis', methods=['GET'])
 def lister_convertis():
-    personnes = PersonneConvertie.query.all()
-    return jsonify([p.to_dict() for p in personnes])
+    return reponse_partagee('liste', lambda: lignes_en_dicts(db.session.execute(selection_convertis())))
+
+# 📊 Chiffres du tableau de bord
+DECALAGE_MADAGASCAR = timedelta(hours=3)
+
+@bp.route('/convertis/stats', methods=['GET'])
+def statistiques_convertis():
+    def calcul():
+        aujourd_hui = (datetime.utcnow() + DECALAGE_MADAGASCAR).date()
+        actifs = convertis_actifs().order_by(None)
+        return {
+            'total': actifs.count(),
+            'communes': actifs.with_entities(db.func.count(db.distinct(PersonneConvertie.commune_id))).scalar(),
+            # Compteur du jour en heure de Madagascar, sans parcourir date_ajout
+            'aujourd_hui': compteurs_paroisse(db.func.coalesce(db.func.sum(CompteurJour.total), 0))
+                           .filter(CompteurJour.jour == aujourd_hui).scalar()
+        }
+    return reponse_partagee('stats', calcul, ttl=60)  # TTL court : le changement de jour
+
+# 📈 Séries temporelles depuis les compteurs journaliers (sans parcourir les inscriptions)
+PERIODES_SERIE = {
+    'day': lambda jour: jour,
+    'week': lambda jour: jour - timedelta(days=jour.weekday()),  # lundi
+    'month': lambda jour: jour.replace(day=1),
+}
+MAX_POINTS_SERIE = 5000
+
+def compter_inscriptions(lignes, sens=1):
+    # lignes : (paroisse_id, date_ajout UTC, commune_id) ; sens -1 pour une suppression
+    comptes = defaultdict(int)
+    for paroisse_id, date_ajout, commune_id in lignes:
+        jour = ((date_ajout or datetime.utcnow()) + DECALAGE_MADAGASCAR).date()
+        comptes[paroisse_id, jour.isoformat(), commune_id] += sens
+    if comptes:
+        db.session.execute(text(
+            'INSERT INTO compteur_jour (paroisse_id, jour, commune_id, total) '
+            'VALUES (:paroisse_id, :jour, :commune_id, :total) '
+            'ON CONFLICT (paroisse_id, jour, commune_id) DO UPDATE SET total = total + excluded.total'),
+            [{'paroisse_id': paroisse_id, 'jour': jour, 'commune_id': commune_id, 'total': total}
+             for (paroisse_id, jour, commune_id), total in comptes.items()])
+
+def compteurs_paroisse(*colonnes):
+    # Compteurs de la paroisse courante (clé primaire menée par paroisse_id)
+    requete = db.session.query(*colonnes)
+    paroisse = paroisse_courante()
+    return requete if paroisse is None else requete.filter(CompteurJour.paroisse_id == paroisse)
+
+def reconstruire_compteurs():
+    # Recalcul complet depuis la table chaude et les archives
+    with db.engine.begin() as conn:
+        conn.execute(text('DELETE FROM compteur_jour'))
+        conn.execute(text(
+            "INSERT INTO compteur_jour (paroisse_id, jour, commune_id, total) "
+            "SELECT paroisse_id, date(date_ajout, '+3 hours'), commune_id, COUNT(*) FROM convertis_tous "
+            "WHERE date_ajout IS NOT NULL GROUP BY 1, 2, 3"))
+
+@bp.route('/convertis/timeseries', methods=['GET'])
+def serie_temporelle():
+    periode = request.args.get('bucket', 'day')
+    if periode not in PERIODES_SERIE:
+        return jsonify({'error': 'bucket doit valoir day, week ou month'}), 400
+    debut_periode = PERIODES_SERIE[periode]
+    try:
+        fin = _date(request.args.get('to')) or datetime.utcnow() + DECALAGE_MADAGASCAR
+        debut = _date(request.args.get('from')) or fin - timedelta(days=90)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    debut, fin = debut_periode(debut.date()), fin.date()
+    if debut > fin or (fin - debut).days >= MAX_POINTS_SERIE:
+        return jsonify({'error': f'Intervalle vide ou de plus de {MAX_POINTS_SERIE} jours'}), 400
+
+    requete = (compteurs_paroisse(CompteurJour.jour, db.func.sum(CompteurJour.total))
+               .filter(CompteurJour.jour.between(debut, fin)).group_by(CompteurJour.jour))
+    if request.args.get('commune'):
+        commune = trouver_lieu('commune', request.args['commune'])
+        requete = requete.filter(CompteurJour.commune_id == (commune.id if commune else None))
+
+    # Agrégation par semaine / mois en Python : au plus quelques milliers de jours
+    totaux = defaultdict(int)
+    for jour, total in requete:
+        totaux[debut_periode(jour)] += total
+    points, jour = [], debut
+    while jour <= fin:
+        if debut_periode(jour) == jour:
+            points.append({'date': jour.isoformat(), 'total': totaux.get(jour, 0)})
+        jour += timedelta(days=1)
+    return repondre({
+        'bucket': periode,
+        'from': debut.isoformat(),
+        'to': fin.isoformat(),
+        'total': sum(p['total'] for p in points),
+        'points': points,
+    })
+
+# 📤 Export NDJSON de toutes les inscriptions, archives comprises, en flux
+def requete_export(args):
+    # Filtres communs aux exports (archives comprises par défaut) ; ValueError si invalides
+    source = vue_convertis_tous if _booleen(args.get('archives')) is not False else None
+    t = PersonneConvertie.__table__ if source is None else source
+    requete = selection_convertis(source).order_by(t.c.id)
+    debut, fin = _date(args.get('date_debut')), _date(args.get('date_fin'), fin=True)
+    if args.get('annee'):
+        annee = int(args['annee'])
+        debut = max(filter(None, [debut, datetime(annee, 1, 1)]))
+        fin = min(filter(None, [fin, datetime(annee + 1, 1, 1)]))
+    if debut:
+        requete = requete.where(t.c.date_ajout >= debut)
+    if fin:
+        requete = requete.where(t.c.date_ajout < fin)
+    if args.get('commune'):
+        commune = trouver_lieu('commune', args['commune'])
+        requete = requete.where(t.c.commune_id == (commune.id if commune else None))
+    return requete
+
+@bp.route('/convertis/export', methods=['GET'])
+def exporter_convertis():
+    format_ = request.args.get('format', 'ndjson')
+    if format_ != 'ndjson' and format_ not in FORMATS_ANALYTIQUES:
+        return jsonify({'error': f'Format inconnu : {format_}'}), 400
+    try:
+        requete = requete_export(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if format_ in FORMATS_ANALYTIQUES:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return jsonify({'error': 'Export Parquet/Arrow indisponible (module pyarrow absent)'}), 501
+
+        def flux_analytique():
+            tampon = TamponFlux()
+            with ouvrir_ecrivain_analytique(pa, format_, tampon) as ecrivain:
+                for lot in lots_analytiques(pa, requete):
+                    ecrivain.write_batch(lot)  # un groupe de lignes par lot
+                    yield tampon.vider()
+            yield tampon.vider()  # pied de fichier Parquet / fin de flux Arrow
+
+        extension = 'parquet' if format_ == 'parquet' else 'arrows'
+        return Response(stream_with_context(flux_analytique()), mimetype=FORMATS_ANALYTIQUES[format_],
+                        headers={'Content-Disposition': f'attachment; filename=convertis.{extension}'})
+
+    def flux():
+        for lot in lots_export(taille_lot=1000, requete=requete):
+            yield ''.join(json.dumps(d, ensure_ascii=False) + '\n' for d in lot)
+
+    return Response(stream_with_context(flux()), mimetype='application/x-ndjson')
 
 # 🔍 Filtrer par commune
-@app.route('/convertis/commune/<commune>', methods=['GET'])
+@bp.route('/convertis/commune/<commune>', methods=['GET'])
 def filtrer_par_commune(commune):
-    personnes = PersonneConvertie.query.filter_by(commune=commune).all()
-    return jsonify([p.to_dict() for p in personnes])
+    lieu = trouver_lieu('commune', commune)
+    if lieu is None:
+        return repondre([])
+    return reponse_en_cache(('commune', lieu.id), [('commune', lieu.id)], lambda: lignes_en_dicts(
+        db.session.execute(selection_convertis().where(PersonneConvertie.commune_id == lieu.id))))
 
 # 🔍 Filtrer par nom d'inviteur
-@app.route('/convertis/inviteur/<nom>', methods=['GET'])
+@bp.route('/convertis/inviteur/<nom>', methods=['GET'])
 def filtrer_par_inviteur(nom):
-    personnes = PersonneConvertie.query.filter_by(nom_inviteur=nom).all()
-    return jsonify([p.to_dict() for p in personnes])
+    nom = _nom_propre(nom)  # même forme qu'à l'enregistrement : /inviteur/jean = /inviteur/Jean
+    return reponse_en_cache(('inviteur', nom), [('inviteur', nom)], lambda: lignes_en_dicts(
+        db.session.execute(selection_convertis().where(PersonneConvertie.nom_inviteur == nom))))
+
+# 📦 Plusieurs convertis par ids en une seule requête (GET ?ids=1,2,3 ou POST {"ids": [...]})
+MAX_IDS_LOT = 5000
+
+@bp.route('/convertis/batch', methods=['GET', 'POST'])
+def obtenir_convertis_par_lot():
+    if request.method == 'POST':
+        ids = (donnees_requete(silent=True) or {}).get('ids')
+        if not isinstance(ids, list):
+            return jsonify({'error': 'Le paramètre ids doit être une liste d\'entiers'}), 400
+    else:
+        ids = request.args.get('ids', '').split(',')
+    try:
+        ids = list(dict.fromkeys(int(i) for i in ids if str(i).strip()))  # dédoublonne, garde l'ordre
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Le paramètre ids doit être une liste d\'entiers'}), 400
+    if not ids:
+        return jsonify({'error': 'Le paramètre ids est requis'}), 400
+    if len(ids) > MAX_IDS_LOT:
+        return jsonify({'error': f'Au plus {MAX_IDS_LOT} ids par requête'}), 400
+
+    trouves = {ligne[0]: ligne for ligne in
+               db.session.execute(selection_convertis(ids=ids))}
+    return repondre({
+        'resultats': lignes_en_dicts(trouves[i] for i in ids if i in trouves),
+        'manquants': [i for i in ids if i not in trouves]
+    })
 
 # ❌ Supprimer un converti
-@app.route('/convertis/<int:id>', methods=['DELETE'])
+@bp.route('/convertis/<int:id>', methods=['DELETE'])
 def supprimer_converti(id):
-    personne = PersonneConvertie.query.get_or_404(id)
-    db.session.delete(personne)
+    personne = convertis_actifs().filter_by(id=id).first_or_404()
+    compter_inscriptions([(personne.paroisse_id, personne.date_ajout, personne.commune_id)], -1)
+    if request.args.get('soft') in ('1', 'true', 'oui'):
+        personne.supprime_le = datetime.utcnow()
+    else:
+        TrigrammeNom.query.filter_by(personne_id=id).delete()
+        db.session.delete(personne)
+    journaliser('delete', {'id': id})
     db.session.commit()
+    invalider_caches(*etiquettes_converti(id, personne.commune_id, personne.nom_inviteur))
     return jsonify({'message': 'Personne supprimée'})
 
+# ❌ Supprimer en masse, par liste d'ids ou par filtre (mêmes critères que /convertis/query)
+@bp.route('/convertis', methods=['DELETE'])
+def supprimer_convertis():
+    data = donnees_requete(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Le corps doit être un objet'}), 400
+    if 'ids' in data:
+        if not isinstance(data['ids'], list) or not all(isinstance(i, int) for i in data['ids']):
+            return jsonify({'error': 'Le champ ids doit être une liste d\'entiers'}), 400
+        ids = sorted(set(data['ids']))
+    elif 'filtre' in data:
+        try:
+            # Un filtre vide ou mal orthographié ne doit jamais valoir « tout supprimer »
+            requete = filtrer_convertis(filtre_json(data['filtre']))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        ids = [i for (i,) in requete.with_entities(PersonneConvertie.id).order_by(PersonneConvertie.id)]
+    else:
+        return jsonify({'error': 'Fournir ids ou un filtre non vide'}), 400
+
+    supprimes = supprimer_par_lots(ids, definitif=not data.get('soft', False))
+    return jsonify({'message': 'Personnes supprimées', 'supprimes': supprimes})
+
 # Add a route to get a single converti by ID
-@app.route('/convertis/<int:id>', methods=['GET'])
+@bp.route('/convertis/<int:id>', methods=['GET'])
 def obtenir_converti(id):
-    personne = PersonneConvertie.query.get_or_404(id)
-    return jsonify(personne.to_dict())
-
+    return reponse_en_cache(('converti', id), [('id', id)],
+                            lambda: convertis_actifs().filter_by(id=id).first_or_404().to_dict())
+
+# 🗃️ Compteurs du cache de ce worker, pour régler taille et TTL
+@bp_admin.route('/cache/stats', methods=['GET'])
+def statistiques_cache():
+    if not admin_autorise():
+        return jsonify({'error': 'Accès refusé'}), 403
+    return jsonify(dict(cache_reponses.stats(), coalescence=calculs_en_cours.stats(), pid=os.getpid()))
+
+
+# 📡 Flux des insertions/suppressions
+@bp.route('/convertis/evenements', methods=['GET'])
+def flux_evenements():
+    # Abonnement avant le rattrapage : rien ne peut passer entre les deux
+    file = diffuseur.abonner()
+    rattrapage = []
+    dernier_id = request.headers.get('Last-Event-ID', type=int)
+    paroisse = paroisse_courante()  # les événements sans paroisse (reset global) vont à tous
+    try:
+        if dernier_id is not None:
+            # Reconnexion : renvoie ce qui a été manqué, ou demande un rechargement complet
+            plus_ancien = db.session.query(db.func.min(EvenementConverti.id)).scalar()
+            if plus_ancien is not None and plus_ancien > dernier_id + 1:
+                rattrapage.append({'id': dernier_id, 'type': 'reset', 'donnees': '{}'})
+            else:
+                rattrapage.extend({'id': ev.id, 'type': ev.type, 'donnees': ev.donnees}
+                                  for ev in EvenementConverti.query
+                                  .filter(EvenementConverti.id > dernier_id,
+                                          db.or_(EvenementConverti.paroisse_id.is_(None),
+                                                 EvenementConverti.paroisse_id == paroisse))
+                                  .order_by(EvenementConverti.id))
+    except Exception:
+        diffuseur.desabonner(file)
+        raise
+    db.session.remove()
+
+    def flux():
+        dernier = dernier_id or 0
+        try:
+            yield 'retry: 3000\n\n'
+            for ev in rattrapage:
+                dernier = max(dernier, ev['id'])
+                yield format_sse(ev)
+            fin = time.monotonic() + DUREE_MAX_FLUX
+            while time.monotonic() < fin:
+                try:
+                    ev = file.get(timeout=15)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                if ev['id'] <= dernier or ev['paroisse_id'] not in (None, paroisse):
+                    continue
+                dernier = ev['id']
+                yield format_sse(ev)
+        finally:
+            diffuseur.desabonner(file)
+
+    return Response(flux(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# 🧮 Requête combinée : filtres, tri et pagination en une seule requête SQL
+TRIS_AUTORISES = {
+    'id': PersonneConvertie.id,
+    'nom': PersonneConvertie.nom,
+    'prenom': PersonneConvertie.prenom,
+    'date_ajout': PersonneConvertie.date_ajout,
+    'nom_inviteur': PersonneConvertie.nom_inviteur,
+    'commune': Commune.nom,
+}
+PAR_PAGE_MAX = 500
+MAX_DECALAGE = 10_000_000  # page * par_page : au-delà, l'entier ne tient plus dans SQLite
+MAX_JOURS_FILTRE = 36500  # au-delà, la date de début sort des dates représentables
+
+def _booleen(valeur):
+    if valeur is None:
+        return None
+    if valeur.lower() in ('1', 'true', 'oui'):
+        return True
+    if valeur.lower() in ('0', 'false', 'non'):
+        return False
+    raise ValueError(f'Booléen invalide : {valeur}')
+
+def _date(valeur, fin=False):
+    if not valeur:
+        return None
+    date = datetime.fromisoformat(valeur)
+    # Une date seule en borne de fin inclut toute la journée
+    if fin and len(valeur) == 10:
+        if date.date() == date.max.date():
+            raise ValueError(f'Date hors limites : {valeur}')
+        return date + timedelta(days=1)
+    return date
+
+def filtrer_convertis(args):
+    # Traduit les paramètres de requête en filtres SQL ; ValueError si invalides
+    requete = convertis_actifs()
+    if args.get('commune'):
+        commune = trouver_lieu('commune', args['commune'])
+        requete = requete.filter(PersonneConvertie.commune_id == (commune.id if commune else None))
+    if args.get('fokontany'):
+        # Un même nom de fokontany peut exister dans plusieurs communes
+        ids = [f.id for f in Fokontany.query.filter_by(cle=cle_resolue('fokontany', args['fokontany']))]
+        requete = requete.filter(PersonneConvertie.fokontany_id.in_(ids))
+    if args.get('quartier'):
+        ids = [q.id for q in Quartier.query.filter_by(cle=cle_resolue('quartier', args['quartier']))]
+        requete = requete.filter(PersonneConvertie.quartier_id.in_(ids))
+    if args.get('inviteur'):
+        requete = requete.filter(PersonneConvertie.nom_inviteur == _nom_propre(args['inviteur']))
+
+    debut, fin = _date(args.get('date_debut')), _date(args.get('date_fin'), fin=True)
+    if args.get('jours'):
+        jours = int(args['jours'])
+        if not 0 <= jours <= MAX_JOURS_FILTRE:
+            raise ValueError(f'Le paramètre jours doit être compris entre 0 et {MAX_JOURS_FILTRE}')
+        debut = max(filter(None, [debut, datetime.utcnow() - timedelta(days=jours)]))
+    if debut:
+        requete = requete.filter(PersonneConvertie.date_ajout >= debut)
+    if fin:
+        requete = requete.filter(PersonneConvertie.date_ajout < fin)
+
+    for param, colonne in (('avec_telephone', PersonneConvertie.telephone),
+                           ('avec_inviteur', PersonneConvertie.nom_inviteur)):
+        avec = _booleen(args.get(param))
+        if avec is True:
+            requete = requete.filter(colonne.isnot(None), colonne != '')
+        elif avec is False:
+            requete = requete.filter(db.or_(colonne.is_(None), colonne == ''))
+    return requete
+
+CRITERES_FILTRE = {'commune', 'fokontany', 'quartier', 'inviteur', 'date_debut', 'date_fin', 'jours',
+                   'avec_telephone', 'avec_inviteur'}
+
+def filtre_json(filtre):
+    # Filtre reçu en JSON -> paramètres texte de filtrer_convertis ; ValueError si invalide
+    if not isinstance(filtre, dict):
+        raise ValueError('Le filtre doit être un objet')
+    inconnus = set(filtre) - CRITERES_FILTRE
+    if inconnus:
+        raise ValueError(f"Critères inconnus : {', '.join(sorted(inconnus))}")
+    args = {}
+    for cle, valeur in filtre.items():
+        if isinstance(valeur, bool) and cle.startswith('avec_'):
+            valeur = 'true' if valeur else 'false'
+        elif isinstance(valeur, int) and not isinstance(valeur, bool) and cle == 'jours':
+            valeur = str(valeur)
+        elif valeur is not None and not isinstance(valeur, str):
+            raise ValueError(f'Valeur invalide pour {cle}')
+        if valeur not in (None, ''):
+            args[cle] = valeur
+    if not args:
+        raise ValueError('Le filtre doit contenir au moins un critère')
+    return args
+
+def trier_convertis(requete, tri):
+    ordres = []
+    for champ in (tri or '-date_ajout').split(','):
+        colonne = TRIS_AUTORISES.get(champ.strip().lstrip('-'))
+        if colonne is None:
+            raise ValueError(f'Tri invalide : {champ}')
+        if colonne is Commune.nom:
+            requete = requete.join(Commune, PersonneConvertie.commune_id == Commune.id)
+        ordres.append(colonne.desc() if champ.strip().startswith('-') else colonne.asc())
+    ordres.append(PersonneConvertie.id.asc())  # ordre stable entre les pages
+    return requete.order_by(*ordres)
+
+@bp.route('/convertis/query', methods=['GET'])
+def interroger_convertis():
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        par_page = min(max(int(request.args.get('par_page', 50)), 1), PAR_PAGE_MAX)
+        if (page - 1) * par_page > MAX_DECALAGE:
+            raise ValueError('Le paramètre page est hors limites')
+        requete = trier_convertis(filtrer_convertis(request.args), request.args.get('tri'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def calcul():
+        # Le total vient de la même requête (fonction de fenêtre), sans second COUNT
+        lignes = (requete.add_columns(db.func.count().over().label('total'))
+                  .offset((page - 1) * par_page).limit(par_page).all())
+        if lignes:
+            total = lignes[0].total
+        else:
+            total = filtrer_convertis(request.args).order_by(None).count()
+        return serialiser({
+            'total': total,
+            'page': page,
+            'par_page': par_page,
+            'resultats': [personne.to_dict() for personne, _ in lignes]
+        }, format_)
+
+    # Version dans la clé : une requête arrivée après une écriture ne reprend pas un calcul antérieur
+    format_ = format_negocie()
+    corps = calculs_en_cours.executer(('query', format_, paroisse_courante(), version_donnees(),
+                                       request.query_string), calcul)
+    return reponse_negociee(corps, format_)
+
+# 👥 Recherche floue de doublons par nom/prénom
+@bp.route('/convertis/doublons', methods=['GET'])
+def rechercher_doublons():
+    nom = request.args.get('nom', '')
+    if not nom.strip():
+        return jsonify({'error': 'Le paramètre nom est requis'}), 400
+    limite = min(request.args.get('limite', 10, type=int), 50)
+    return repondre(chercher_doublons(nom, request.args.get('prenom', ''), limite))
 
 # 🔍 Get unique values for autocomplete
-@app.route('/convertis/unique-values', methods=['GET'])
+@bp.route('/convertis/unique-values', methods=['GET'])
 def get_unique_values():
-    communes = db.session.query(PersonneConvertie.commune).distinct().all()
-    fokontanys = db.session.query(PersonneConvertie.fokontany).distinct().all()
-    quartiers = db.session.query(PersonneConvertie.quartier).distinct().filter(PersonneConvertie.quartier != '').all()
-    inviteurs = db.session.query(PersonneConvertie.nom_inviteur).distinct().filter(PersonneConvertie.nom_inviteur != '').all()
-    
-    return jsonify({
-        'communes': [c[0] for c in communes],
-        'fokontanys': [f[0] for f in fokontanys],
-        'quartiers': [q[0] for q in quartiers],
-        'inviteurs': [i[0] for i in inviteurs]
-    })
-
-@app.route('/', methods=['GET'])
-def index():
-    return """<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Évangélisation Madagascar</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #333;
-            overflow-x: hidden;
-            min-height: 100vh;
-        }
-
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            background: white;
-            min-height: 100vh;
-            position: relative;
-            box-shadow: 0 0 20px rgba(0,0,0,0.1);
-        }
-
-        /* Header */
-        .header {
-            background: linear-gradient(135deg, #ff6b6b, #ee5a24);
-            color: white;
-            padding: 30px;
-            text-align: center;
-            position: relative;
-            overflow: hidden;
-        }
-
-        .header::before {
-            content: '';
-            position: absolute;
-            top: -50%;
-            left: -50%;
-            width: 200%;
-            height: 200%;
-            background: radial-gradient(circle, rgba(255,255,255,0.1) 1px, transparent 1px);
-            background-size: 20px 20px;
-            animation: float 20s infinite linear;
-        }
-
-        @keyframes float {
-            0% { transform: translate(-50%, -50%) rotate(0deg); }
-            100% { transform: translate(-50%, -50%) rotate(360deg); }
-        }
-
-        .header h1 {
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-            position: relative;
-            z-index: 2;
-        }
-
-        .header .subtitle {
-            font-size: 1.2rem;
-            opacity: 0.9;
-            position: relative;
-            z-index: 2;
-        }
-
-        .flag {
-            display: inline-block;
-            margin-left: 8px;
-            font-size: 1.5rem;
-        }
-
-        /* Language Toggle */
-        .language-toggle {
-            position: absolute;
-            top: 20px;
-            right: 20px;
-            background: rgba(255,255,255,0.2);
-            border: 1px solid rgba(255,255,255,0.3);
-            color: white;
-            padding: 10px 15px;
-            border-radius: 25px;
-            font-size: 0.9rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            z-index: 3;
-        }
-
-        .language-toggle:hover {
-            background: rgba(255,255,255,0.3);
-            transform: scale(1.05);
-        }
-
-        /* Main Content Layout */
-        .main-content {
-            display: grid;
-            grid-template-columns: 1fr;
-            gap: 20px;
-            padding: 20px;
-        }
-
-        @media (min-width: 768px) {
-            .main-content {
-                grid-template-columns: 300px 1fr;
-                gap: 30px;
-                padding: 30px;
-            }
-        }
-
-        @media (min-width: 1200px) {
-            .main-content {
-                grid-template-columns: 350px 1fr 300px;
-            }
-        }
-
-        /* Sidebar */
-        .sidebar {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 3px 15px rgba(0,0,0,0.08);
-            height: fit-content;
-            position: sticky;
-            top: 20px;
-        }
-
-        /* Search & Filter Section */
-        .search-section {
-            margin-bottom: 30px;
-        }
-
-        .search-bar {
-            position: relative;
-            margin-bottom: 20px;
-        }
-
-        .search-input {
-            width: 100%;
-            padding: 15px 50px 15px 20px;
-            border: 2px solid #e1e8ed;
-            border-radius: 25px;
-            font-size: 1rem;
-            transition: all 0.3s ease;
-        }
-
-        .search-input:focus {
-            outline: none;
-            border-color: #ff6b6b;
-            box-shadow: 0 0 0 3px rgba(255, 107, 107, 0.1);
-        }
-
-        .search-icon {
-            position: absolute;
-            right: 20px;
-            top: 50%;
-            transform: translateY(-50%);
-            color: #999;
-            font-size: 1.2rem;
-        }
-
-        .filters {
-            display: flex;
-            gap: 10px;
-            flex-wrap: wrap;
-        }
-
-        .filter-btn {
-            padding: 10px 18px;
-            background: #f8f9fa;
-            border: 1px solid #dee2e6;
-            border-radius: 20px;
-            font-size: 0.9rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-
-        .filter-btn.active {
-            background: #ff6b6b;
-            color: white;
-            border-color: #ff6b6b;
-        }
-
-        .filter-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }
-
-        /* Stats Cards */
-        .stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(120px, 1fr));
-            gap: 15px;
-            margin-bottom: 30px;
-        }
-
-        .stat-card {
-            background: white;
-            padding: 20px;
-            border-radius: 15px;
-            text-align: center;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-            transition: transform 0.3s ease;
-            border-left: 4px solid #ff6b6b;
-        }
-
-        .stat-card:hover {
-            transform: translateY(-5px);
-        }
-
-        .stat-number {
-            font-size: 2rem;
-            font-weight: bold;
-            color: #ff6b6b;
-            margin-bottom: 8px;
-        }
-
-        .stat-label {
-            font-size: 0.9rem;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
-
-        /* Content Area */
-        .content-area {
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 3px 15px rgba(0,0,0,0.08);
-        }
-
-        .section-title {
-            font-size: 1.4rem;
-            font-weight: 600;
-            margin-bottom: 25px;
-            color: #333;
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-        }
-
-        .section-title::before {
-            content: '';
-            width: 4px;
-            height: 25px;
-            background: #ff6b6b;
-            margin-right: 15px;
-            border-radius: 2px;
-        }
-
-        .add-btn {
-            background: linear-gradient(135deg, #ff6b6b, #ee5a24);
-            color: white;
-            border: none;
-            padding: 10px 20px;
-            border-radius: 20px;
-            cursor: pointer;
-            font-size: 0.9rem;
-            transition: all 0.3s ease;
-        }
-
-        .add-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(255, 107, 107, 0.3);
-        }
-
-        /* People Grid */
-        .people-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(350px, 1fr));
-            gap: 20px;
-        }
-
-        @media (max-width: 768px) {
-            .people-grid {
-                grid-template-columns: 1fr;
-            }
-        }
+    def calcul():
+        # Les tables de lieux sont partagées : seuls les lieux des inscriptions de la paroisse
+        # (EXISTS corrélé : s'arrête à la première inscription active, via les index menés par la paroisse)
+        actifs = convertis_actifs()
+        def lieux(modele, colonne):
+            return db.session.query(modele.nom).filter(actifs.filter(colonne == modele.id).exists()).distinct().all()
+        communes = lieux(Commune, PersonneConvertie.commune_id)
+        fokontanys = lieux(Fokontany, PersonneConvertie.fokontany_id)
+        quartiers = lieux(Quartier, PersonneConvertie.quartier_id)
+        inviteurs = (actifs.with_entities(PersonneConvertie.nom_inviteur).distinct()
+                     .filter(PersonneConvertie.nom_inviteur != '').all())
 
-        .person-card {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 3px 15px rgba(0,0,0,0.08);
-            border-left: 4px solid #ff6b6b;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-
-        .person-card::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 2px;
-            background: linear-gradient(90deg, #ff6b6b, #ee5a24);
-        }
-
-        .person-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-        }
-
-        .person-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: flex-start;
-            margin-bottom: 15px;
-        }
-
-        .person-name {
-            font-size: 1.2rem;
-            font-weight: 600;
-            color: #333;
-            margin-bottom: 5px;
-        }
-
-        .person-contact {
-            font-size: 0.95rem;
-            color: #666;
-        }
-
-        .person-date {
-            font-size: 0.85rem;
-            color: #999;
-            background: #f8f9fa;
-            padding: 5px 10px;
-            border-radius: 12px;
-        }
-
-        .person-details {
-            margin-top: 15px;
-            padding-top: 15px;
-            border-top: 1px solid #f0f0f0;
-        }
-
-        .detail-item {
-            display: flex;
-            align-items: center;
-            margin-bottom: 10px;
-            font-size: 0.9rem;
-        }
-
-        .detail-icon {
-            width: 18px;
-            margin-right: 10px;
-            color: #ff6b6b;
-        }
-
-        .detail-text {
-            color: #666;
-        }
-
-        /* Modal */
-        .modal {
-            display: none;
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: rgba(0,0,0,0.8);
-            z-index: 1000;
-            backdrop-filter: blur(5px);
-        }
-
-        .modal.active {
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            animation: fadeIn 0.3s ease;
-        }
-
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-
-        .modal-content {
-            background: white;
-            width: 90%;
-            max-width: 600px;
-            max-height: 90vh;
-            border-radius: 20px;
-            padding: 40px;
-            position: relative;
-            animation: slideUp 0.3s ease;
-            overflow-y: auto;
-        }
-
-        @keyframes slideUp {
-            from { transform: translateY(50px); opacity: 0; }
-            to { transform: translateY(0); opacity: 1; }
-        }
-
-        .modal-header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-
-        .modal-title {
-            font-size: 1.5rem;
-            font-weight: 600;
-            color: #333;
-            margin-bottom: 8px;
-        }
-
-        .modal-subtitle {
-            color: #666;
-            font-size: 1rem;
-        }
-
-        .form-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-        }
-
-        .form-group {
-            margin-bottom: 20px;
-        }
-
-        .form-group.full-width {
-            grid-column: 1 / -1;
-        }
-
-        .form-label {
-            display: block;
-            margin-bottom: 8px;
-            font-weight: 500;
-            color: #333;
-            font-size: 0.95rem;
-        }
-
-        .form-input, .form-select {
-            width: 100%;
-            padding: 15px 18px;
-            border: 2px solid #e1e8ed;
-            border-radius: 12px;
-            font-size: 1rem;
-            transition: all 0.3s ease;
-        }
-
-        .form-input:focus, .form-select:focus {
-            outline: none;
-            border-color: #ff6b6b;
-            box-shadow: 0 0 0 3px rgba(255, 107, 107, 0.1);
-        }
-
-        .form-actions {
-            display: flex;
-            gap: 15px;
-            margin-top: 30px;
-            justify-content: flex-end;
-        }
-
-        .btn {
-            padding: 15px 25px;
-            border: none;
-            border-radius: 12px;
-            font-size: 1rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            font-weight: 500;
-            min-width: 120px;
-        }
-
-        .btn-primary {
-            background: linear-gradient(135deg, #ff6b6b, #ee5a24);
-            color: white;
-        }
-
-        .btn-primary:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(255, 107, 107, 0.3);
-        }
-
-        .btn-secondary {
-            background: #f8f9fa;
-            color: #666;
-            border: 1px solid #dee2e6;
-        }
-
-        .btn-secondary:hover {
-            background: #e9ecef;
-        }
-
-        .close-btn {
-            position: absolute;
-            top: 20px;
-            right: 20px;
-            background: none;
-            border: none;
-            font-size: 1.5rem;
-            color: #999;
-            cursor: pointer;
-            width: 35px;
-            height: 35px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            border-radius: 50%;
-            transition: all 0.3s ease;
-        }
-
-        .close-btn:hover {
-            background: #f0f0f0;
-            transform: rotate(90deg);
-        }
-
-        /* Loading and Empty States */
-        .loading {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 60px;
-            font-size: 1.1rem;
-            color: #666;
-        }
-
-        .loading::before {
-            content: '⏳';
-            margin-right: 10px;
-            font-size: 1.5rem;
-            animation: spin 2s infinite;
-        }
-
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-
-        .empty-state {
-            text-align: center;
-            padding: 60px 20px;
-            color: #666;
-        }
-
-        .empty-icon {
-            font-size: 4rem;
-            margin-bottom: 20px;
-            opacity: 0.3;
-        }
-
-        .empty-title {
-            font-size: 1.3rem;
-            font-weight: 600;
-            margin-bottom: 10px;
-        }
-
-        .empty-text {
-            font-size: 1rem;
-            line-height: 1.5;
-        }
-
-        /* Notification */
-        .notification {
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            background: #28a745;
-            color: white;
-            padding: 15px 25px;
-            border-radius: 10px;
-            z-index: 1001;
-            transform: translateX(100%);
-            transition: transform 0.3s ease;
-        }
-
-        .notification.show {
-            transform: translateX(0);
-        }
-
-        .notification.error {
-            background: #dc3545;
-        }
-
-        /* Responsive adjustments */
-        @media (max-width: 768px) {
-            .header {
-                padding: 20px;
-            }
-            
-            .header h1 {
-                font-size: 1.8rem;
-            }
-            
-            .header .subtitle {
-                font-size: 1rem;
-            }
-            
-            .main-content {
-                grid-template-columns: 1fr;
-                padding: 15px;
-            }
-            
-            .sidebar {
-                position: static;
-                margin-bottom: 20px;
-            }
-            
-            .modal-content {
-                width: 95%;
-                padding: 25px;
-            }
-            
-            .form-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <!-- Header -->
-        <div class="header">
-            <button class="language-toggle" onclick="toggleLanguage()">🇫🇷 FR</button>
-            <h1>Évangélisation<span class="flag">🇲🇬</span></h1>
-            <p class="subtitle">Fiangonana sy Fitoriana</p>
-        </div>
-
-        <!-- Main Content -->
-        <div class="main-content">
-            <!-- Sidebar -->
-            <div class="sidebar">
-                <!-- Search & Filter Section -->
-                <div class="search-section">
-                    <div class="search-bar">
-                        <input type="text" class="search-input" placeholder="Rechercher une personne..." id="searchInput">
-                        <span class="search-icon">🔍</span>
-                    </div>
-                    <div class="filters">
-                        <button class="filter-btn active" onclick="filterBy('all')">Tous</button>
-                        <button class="filter-btn" onclick="filterBy('recent')">Récents</button>
-                        <button class="filter-btn" onclick="filterBy('commune')">Par commune</button>
-                        <button class="filter-btn" onclick="filterBy('inviteur')">Par inviteur</button>
-                    </div>
-                </div>
-
-                <!-- Stats -->
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-number" id="totalCount">0</div>
-                        <div class="stat-label">Personnes</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number" id="communeCount">0</div>
-                        <div class="stat-label">Communes</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number" id="todayCount">0</div>
-                        <div class="stat-label">Aujourd'hui</div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Content Area -->
-            <div class="content-area">
-                <div class="section-title">
-                    📋 Personnes rencontrées
-                    <button class="add-btn" onclick="openAddModal()">➕ Ajouter</button>
-                </div>
-                
-                <div id="peopleContainer">
-                    <div class="loading">Chargement des données...</div>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <!-- Add Person Modal -->
-    <div class="modal" id="addModal">
-        <div class="modal-content">
-            <button class="close-btn" onclick="closeAddModal()">✕</button>
-            <div class="modal-header">
-                <h2 class="modal-title">Nouvelle personne</h2>
-                <p class="modal-subtitle">Ajouter une personne rencontrée</p>
-            </div>
-            
-            <form id="addPersonForm">
-                <div class="form-grid">
-                    <div class="form-group">
-                        <label class="form-label">Nom *</label>
-                        <input type="text" name="nom" class="form-input" placeholder="Ex: Rakoto" required>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label class="form-label">Prénom *</label>
-                        <input type="text" name="prenom" class="form-input" placeholder="Ex: Jean Michel" required>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label class="form-label">Téléphone</label>
-                        <input type="tel" name="telephone" class="form-input" placeholder="+261 34 12 345 67">
-                    </div>
-                    
-                    <div class="form-group">
-                        <label class="form-label">Commune *</label>
-                        <input type="text" name="commune" class="form-input" placeholder="Ex: Antananarivo" required list="communeList">
-                        <datalist id="communeList"></datalist>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label class="form-label">Fokontany *</label>
-                        <input type="text" name="fokontany" class="form-input" placeholder="Ex: Analakely" required list="fokontanyList">
-                        <datalist id="fokontanyList"></datalist>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label class="form-label">Quartier</label>
-                        <input type="text" name="quartier" class="form-input" placeholder="Ex: Centre ville" list="quartierList">
-                        <datalist id="quartierList"></datalist>
-                    </div>
-                    
-                    <div class="form-group full-width">
-                        <label class="form-label">Nom de l'inviteur</label>
-                        <input type="text" name="nom_inviteur" class="form-input" placeholder="Personne qui a invité" list="inviteurList">
-                        <datalist id="inviteurList"></datalist>
-                    </div>
-                </div>
-                
-                <div class="form-actions">
-                    <button type="button" class="btn btn-secondary" onclick="closeAddModal()">Annuler</button>
-                    <button type="submit" class="btn btn-primary">Ajouter</button>
-                </div>
-            </form>
-        </div>
-    </div>
-
-    <!-- Notification -->
-    <div id="notification" class="notification"></div>
-
-    <script>
-        let currentLanguage = 'fr';
-        let people = [];
-        let uniqueValues = {};
-        const API_BASE = 'https://fmi-new.render.com';
-
-        // Initialize the app
-        document.addEventListener('DOMContentLoaded', function() {
-            loadPeople();
-            loadUniqueValues();
-        });
-
-        // API Functions
-        async function loadPeople() {
-            try {
-                const response = await fetch(`${API_BASE}/convertis`);
-                if (!response.ok) throw new Error('Network response was not ok');
-                people = await response.json();
-                renderPeople(people);
-                updateStats();
-            } catch (error) {
-                console.error('Error loading people:', error);
-                showNotification('Erreur lors du chargement des données', 'error');
-                renderEmptyState();
-            }
-        }
-
-        async function loadUniqueValues() {
-            try {
-                const response = await fetch(`${API_BASE}/convertis/unique-values`);
-                if (!response.ok) throw new Error('Network response was not ok');
-                uniqueValues = await response.json();
-                updateDataLists();
-            } catch (error) {
-                console.error('Error loading unique values:', error);
-            }
-        }
-
-        async function addPerson(personData) {
-            try {
-                const response = await fetch(`${API_BASE}/convertis`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify(personData)
-                });
-                
-                if (!response.ok) {
-                    const errorData = await response.json();
-                    throw new Error(errorData.error || 'Erreur lors de l\'ajout');
-                }
-                
-                const result = await response.json();
-                showNotification('Personne ajoutée avec succès!');
-                loadPeople(); // Reload the list
-                loadUniqueValues(); // Update autocomplete lists
-                return result;
-            } catch (error) {
-                console.error('Error adding person:', error);
-                showNotification(error.message, 'error');
-                throw error;
-            }
-        }
-
-        // Render Functions
-        function renderPeople(peopleToRender) {
-            const container = document.getElementById('peopleContainer');
-            
-            if (peopleToRender.length === 0) {
-                renderEmptyState();
-                return;
-            }
-            
-            const peopleGrid = document.createElement('div');
-            peopleGrid.className = 'people-grid';
-            
-            peopleToRender.forEach(person => {
-                const personCard = createPersonCard(person);
-                peopleGrid.appendChild(personCard);
-            });
-            
-            container.innerHTML = '';
-            container.appendChild(peopleGrid);
-        }
-
-        function createPersonCard(person) {
-            const card = document.createElement('div');
-            card.className = 'person-card';
-            
-            const date = person.data_ajout ? new Date(person.data_ajout) : new Date();
-            const dateStr = formatDate(date);
-            
-            card.innerHTML = `
-                <div class="person-header">
-                    <div>
-                        <div class="person-name">${person.prenom} ${person.nom}</div>
-                        <div class="person-contact">${person.telephone || 'Pas de téléphone'}</div>
-                    </div>
-                    <div class="person-date">${dateStr}</div>
-                </div>
-                <div class="person-details">
-                    <div class="detail-item">
-                        <span class="detail-icon">📍</span>
-                        <span class="detail-text">${person.commune} - ${person.fokontany}</span>
-                    </div>
-                    ${person.quartier ? `
-                    <div class="detail-item">
-                        <span class="detail-icon">🏘️</span>
-                        <span class="detail-text">${person.quartier}</span>
-                    </div>
-                    ` : ''}
-                    ${person.nom_inviteur ? `
-                    <div class="detail-item">
-                        <span class="detail-icon">👤</span>
-                        <span class="detail-text">Invité par ${person.nom_inviteur}</span>
-                    </div>
-                    ` : ''}
-                </div>
-            `;
-            
-            return card;
-        }
-
-        function renderEmptyState() {
-            const container = document.getElementById('peopleContainer');
-            container.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-icon">📋</div>
-                    <div class="empty-title">Aucune personne enregistrée</div>
-                    <div class="empty-text">Commencez par ajouter une personne rencontrée lors de vos activités d'évangélisation.</div>
-                </div>
-            `;
-        }
-
-        // Utility Functions
-        function formatDate(date) {
-            const now = new Date();
-            const diff = now - date;
-            const days = Math.floor(diff / (1000 * 60 * 60 * 24));
-            
-            if (days === 0) return 'Aujourd\'hui';
-            if (days === 1) return 'Hier';
-            if (days < 7) return `Il y a ${days} jours`;
-            
-            return date.toLocaleDateString('fr-FR');
-        }
-
-        function updateStats() {
-            document.getElementById('totalCount').textContent = people.length;
-            
-            const communes = new Set(people.map(p => p.commune));
-            document.getElementById('communeCount').textContent = communes.size;
-            
-            const today = new Date().toDateString();
-            const todayCount = people.filter(p => {
-                const personDate = new Date(p.data_ajout || p.date_ajout).toDateString();
-                return personDate === today;
-            }).length;
-            document.getElementById('todayCount').textContent = todayCount;
-        }
-
-        function updateDataLists() {
-            const lists = {
-                'communeList': uniqueValues.communes || [],
-                'fokontanyList': uniqueValues.fokontanys || [],
-                'quartierList': uniqueValues.quartiers || [],
-                'inviteurList': uniqueValues.inviteurs || []
-            };
-            
-            Object.entries(lists).forEach(([listId, values]) => {
-                const datalist = document.getElementById(listId);
-                if (datalist) {
-                    datalist.innerHTML = values.map(value => `<option value="${value}">`).join('');
-                }
-            });
-        }
-
-        function showNotification(message, type = 'success') {
-            const notification = document.getElementById('notification');
-            notification.textContent = message;
-            notification.className = `notification ${type}`;
-            notification.classList.add('show');
-            
-            setTimeout(() => {
-                notification.classList.remove('show');
-            }, 3000);
-        }
-
-        // Event Handlers
-        function toggleLanguage() {
-            const toggle = document.querySelector('.language-toggle');
-            const title = document.querySelector('.header h1');
-            const subtitle = document.querySelector('.subtitle');
-            
-            if (currentLanguage === 'fr') {
-                currentLanguage = 'mg';
-                toggle.textContent = '🇲🇬 MG';
-                title.innerHTML = 'Fitoriana<span class="flag">🇲🇬</span>';
-                subtitle.textContent = 'Évangélisation et Mission';
-                
-                document.querySelector('.search-input').placeholder = 'Hitady olona...';
-                document.querySelector('.modal-title').textContent = 'Olona vaovao';
-                document.querySelector('.modal-subtitle').textContent = 'Hanampy olona nihaona';
-                
-            } else {
-                currentLanguage = 'fr';
-                toggle.textContent = '🇫🇷 FR';
-                title.innerHTML = 'Évangélisation<span class="flag">🇲🇬</span>';
-                subtitle.textContent = 'Fiangonana sy Fitoriana';
-                
-                document.querySelector('.search-input').placeholder = 'Rechercher une personne...';
-                document.querySelector('.modal-title').textContent = 'Nouvelle personne';
-                document.querySelector('.modal-subtitle').textContent = 'Ajouter une personne rencontrée';
-            }
-        }
-
-        function filterBy(type) {
-            // Remove active class from all filter buttons
-            document.querySelectorAll('.filter-btn').forEach(btn => {
-                btn.classList.remove('active');
-            });
-            
-            // Add active class to clicked button
-            event.target.classList.add('active');
-            
-            let filteredPeople = [...people];
-            
-            switch(type) {
-                case 'recent':
-                    const sevenDaysAgo = new Date();
-                    sevenDaysAgo.setDate(sevenDaysAgo.getDate() - 7);
-                    filteredPeople = people.filter(p => {
-                        const personDate = new Date(p.data_ajout || p.date_ajout);
-                        return personDate >= sevenDaysAgo;
-                    });
-                    break;
-                case 'commune':
-                    // Group by commune - could implement dropdown for specific commune
-                    break;
-                case 'inviteur':
-                    filteredPeople = people.filter(p => p.nom_inviteur && p.nom_inviteur.trim() !== '');
-                    break;
-                case 'all':
-                default:
-                    // Show all people
-                    break;
-            }
-            
-            renderPeople(filteredPeople);
-        }
-
-        function openAddModal() {
-            document.getElementById('addModal').classList.add('active');
-            document.body.style.overflow = 'hidden';
-        }
+        return {
+            'communes': [c[0] for c in communes],
+            'fokontanys': [f[0] for f in fokontanys],
+            'quartiers': [q[0] for q in quartiers],
+            'inviteurs': [i[0] for i in inviteurs]
+        }
+    return reponse_partagee('unique-values', calcul)
+
+# 🗺️ Enregistrer un alias d'orthographe pour un lieu
+@bp_admin.route('/lieux/alias', methods=['POST'])
+def ajouter_alias_lieu():
+    # Les lieux sont communs à toutes les paroisses : réservé à l'administration
+    if not admin_autorise():
+        return jsonify({'error': 'Accès refusé'}), 403
+    data = request.get_json()
+    if data.get('type') not in TYPES_LIEU:
+        return jsonify({'error': 'Le type doit être commune, fokontany ou quartier'}), 400
+    for field in ['alias', 'cible']:
+        if not cle_lieu(data.get(field)):
+            return jsonify({'error': f'Le champ {field} est requis'}), 400
+    try:
+        enregistrer_alias(data['type'], data['alias'], data['cible'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'message': 'Alias enregistré'}), 201
+
+# 🗺️ Carte : centroïdes des fokontany, agrégés par cellule geohash selon le zoom
+BASE32_GEOHASH = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION_GEOHASH = 9
+# (zoom maximal, longueur du préfixe) : ~630 km à z≤4 ... ~150 m au-delà de z15
+PRECISIONS_ZOOM = [(4, 2), (7, 3), (10, 4), (12, 5), (15, 6)]
+
+def encoder_geohash(latitude, longitude, precision=PRECISION_GEOHASH):
+    intervalles = {'lat': [-90.0, 90.0], 'lon': [-180.0, 180.0]}
+    code, valeur, bits, axe = [], 0, 0, 'lon'
+    while len(code) < precision:
+        intervalle = intervalles[axe]
+        milieu = (intervalle[0] + intervalle[1]) / 2
+        coordonnee = longitude if axe == 'lon' else latitude
+        valeur <<= 1
+        if coordonnee >= milieu:
+            valeur |= 1
+            intervalle[0] = milieu
+        else:
+            intervalle[1] = milieu
+        axe = 'lat' if axe == 'lon' else 'lon'
+        bits += 1
+        if bits == 5:
+            code.append(BASE32_GEOHASH[valeur])
+            valeur, bits = 0, 0
+    return ''.join(code)
+
+def precision_zoom(zoom):
+    return next((p for zoom_max, p in PRECISIONS_ZOOM if zoom <= zoom_max), 7)
+
+def definir_centroide(fokontany, latitude, longitude):
+    fokontany.latitude, fokontany.longitude = latitude, longitude
+    fokontany.geohash = encoder_geohash(latitude, longitude)
+
+def enregistrer_coordonnees(lignes):
+    # lignes : dictionnaires commune, fokontany, latitude, longitude ; fokontany inconnus créés
+    mis_a_jour, erreurs = 0, []
+    for numero, ligne in enumerate(lignes, start=1):
+        try:
+            latitude, longitude = float(ligne.get('latitude')), float(ligne.get('longitude'))
+        except (TypeError, ValueError):
+            erreurs.append({'ligne': numero, 'erreur': 'latitude et longitude doivent être des nombres'})
+            continue
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            erreurs.append({'ligne': numero, 'erreur': 'Coordonnées hors limites'})
+            continue
+        if not cle_lieu(ligne.get('commune')) or not cle_lieu(ligne.get('fokontany')):
+            erreurs.append({'ligne': numero, 'erreur': 'commune et fokontany sont requis'})
+            continue
+        _, fokontany_id, _ = resoudre_lieux(ligne['commune'], ligne['fokontany'])
+        definir_centroide(db.session.get(Fokontany, fokontany_id), latitude, longitude)
+        mis_a_jour += 1
+    db.session.commit()
+    if mis_a_jour:
+        # Les lieux sont communs : les cartes de toutes les paroisses changent
+        cache_reponses.vider()
+        cache_partage().incrementer(CLE_VERSION)
+    return mis_a_jour, erreurs
+
+@bp_admin.route('/lieux/coordonnees', methods=['POST'])
+def ajouter_coordonnees_lieux():
+    if not admin_autorise():
+        return jsonify({'error': 'Accès refusé'}), 403
+    data = donnees_requete()
+    lignes = data if isinstance(data, list) else [data]
+    if not all(isinstance(ligne, dict) for ligne in lignes):
+        return jsonify({'error': 'Le corps doit être un objet ou une liste d\'objets'}), 400
+    mis_a_jour, erreurs = enregistrer_coordonnees(lignes)
+    return jsonify({'mis_a_jour': mis_a_jour, 'erreurs': erreurs}), 400 if erreurs and not mis_a_jour else 200
+
+@bp.route('/convertis/carte', methods=['GET'])
+def carte_convertis():
+    try:
+        zoom = min(max(int(request.args.get('zoom', 6)), 0), 22)
+        ouest, sud, est, nord = ([float(v) for v in request.args['bbox'].split(',')]
+                                 if request.args.get('bbox') else (-180.0, -90.0, 180.0, 90.0))
+        # nan échappe aux comparaisons, inf fait planter l'arrondi à la tuile
+        if not all(math.isfinite(v) for v in (ouest, sud, est, nord)) or ouest > est or sud > nord:
+            raise ValueError('bbox attendu : ouest,sud,est,nord')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # bbox élargie au quart de tuile : les vues voisines partagent la même entrée de cache
+    pas = 360 / 2 ** (zoom + 2)
+    ouest, sud = pas * int(ouest // pas), pas * int(sud // pas)
+    est, nord = pas * -int(-est // pas), pas * -int(-nord // pas)
+    precision = precision_zoom(zoom)
+
+    def calcul():
+        # Un comptage couvrant par fokontany de la vue : le coût suit la zone affichée, pas la table
+        total = (db.select(db.func.count())
+                 .where(PersonneConvertie.paroisse_id == paroisse_courante(),
+                        PersonneConvertie.fokontany_id == Fokontany.id, PersonneConvertie.supprime_le.is_(None))
+                 .correlate(Fokontany).scalar_subquery())
+        lignes = db.session.execute(
+            db.select(Fokontany.geohash, Fokontany.latitude, Fokontany.longitude, total)
+            .where(Fokontany.latitude.between(sud, nord), Fokontany.longitude.between(ouest, est))).all()
+        groupes = {}
+        for geohash, latitude, longitude, nombre in lignes:
+            if nombre:
+                groupe = groupes.setdefault(geohash[:precision], [0, 0.0, 0.0, 0])
+                groupe[0] += nombre
+                groupe[1] += latitude * nombre  # centre pondéré par le nombre d'inscrits
+                groupe[2] += longitude * nombre
+                groupe[3] += 1
+        return {
+            'zoom': zoom,
+            'precision': precision,
+            'bbox': [ouest, sud, est, nord],
+            'groupes': [{'geohash': cellule, 'total': n, 'latitude': round(lat / n, 6),
+                         'longitude': round(lon / n, 6), 'fokontany': nb_fokontany}
+                        for cellule, (n, lat, lon, nb_fokontany) in sorted(groupes.items())],
+        }
+    return reponse_partagee(f'carte:{zoom}:{ouest},{sud},{est},{nord}', calcul)
+
+# ⛪ Paroisses : liste publique, création réservée à l'administrateur
+RE_CLE_PAROISSE = re.compile(r'[a-z0-9][a-z0-9-]{0,49}')
+
+def creer_paroisse(cle, nom):
+    # Retourne (paroisse, None) ou (None, message d'erreur)
+    cle, nom = _texte(cle or '').lower(), _texte(nom or '')
+    if not RE_CLE_PAROISSE.fullmatch(cle):
+        return None, 'La clé doit compter de 1 à 50 caractères parmi a-z, 0-9 et -'
+    if not nom or len(nom) > Paroisse.nom.type.length:
+        return None, f'Le nom est requis ({Paroisse.nom.type.length} caractères au plus)'
+    paroisse = Paroisse(cle=cle, nom=nom)
+    db.session.add(paroisse)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None, f'La paroisse {cle} existe déjà'
+    return paroisse, None
+
+@bp_admin.route('/paroisses', methods=['GET'])
+def lister_paroisses():
+    return repondre([paroisse.to_dict() for paroisse in Paroisse.query.order_by(Paroisse.id)])
+
+@bp_admin.route('/paroisses', methods=['POST'])
+def ajouter_paroisse():
+    if not admin_autorise():
+        return jsonify({'error': 'Accès refusé'}), 403
+    data = donnees_requete(silent=True) or {}
+    paroisse, erreur = creer_paroisse(data.get('cle'), data.get('nom'))
+    if erreur:
+        return jsonify({'error': erreur}), 400
+    return jsonify(paroisse.to_dict()), 201
+
+# 💾 Sauvegarde à chaud de convertis.db, sans bloquer les écritures
+PAGES_PAR_ETAPE = 1024
+
+def gevent_actif():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+def thread_systeme(fonction, *args):
+    # Lance fonction dans un vrai thread système et retourne de quoi attendre son résultat.
+    # Sous gevent, threading.Thread ne crée qu'un greenlet : un appel C long (VACUUM INTO,
+    # backup) figerait le worker entier, sonde comprise.
+    if gevent_actif():
+        from gevent import get_hub
+        return get_hub().threadpool.spawn(fonction, *args).get  # attente coopérative
+    resultat = {}
+
+    def executer():
+        try:
+            resultat['valeur'] = fonction(*args)
+        except BaseException as e:
+            resultat['erreur'] = e
+
+    fil = threading.Thread(target=executer, daemon=True)
+    fil.start()
+
+    def attendre():
+        fil.join()
+        if 'erreur' in resultat:
+            raise resultat['erreur']
+        return resultat.get('valeur')
+    return attendre
+
+def sommeil_systeme():
+    # time.sleep d'origine, pour un thread système : celui de gevent y créerait un hub
+    if gevent_actif():
+        from gevent import monkey
+        return monkey.get_original('time', 'sleep')
+    return time.sleep
+
+class SondeEcriture:
+    # Mesure pendant la sauvegarde combien de temps une écriture doit attendre le verrou
+    def __init__(self, chemin, intervalle=0.05):
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self.attentes = []
+        self.arret = False  # simple drapeau : lu depuis un thread système, hors de gevent
+        self.attendre = None
+
+    def _boucle(self):
+        dormir = sommeil_systeme()
+        conn = sqlite3.connect(self.chemin, timeout=30, isolation_level=None)
+        try:
+            while not self.arret:
+                dormir(self.intervalle)
+                debut = time.monotonic()
+                conn.execute('BEGIN IMMEDIATE')
+                self.attentes.append(time.monotonic() - debut)
+                conn.execute('ROLLBACK')
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.attendre = thread_systeme(self._boucle)
+        return self
+
+    def __exit__(self, *exc):
+        self.arret = True
+        self.attendre()
+
+def _copier_base(source, destination, mode):
+    # Retourne le nombre d'étapes ; exécuté dans un thread système (voir thread_systeme)
+    etapes = 0
+    conn = sqlite3.connect(source, timeout=30)
+    try:
+        if mode == 'vacuum':
+            conn.execute('VACUUM INTO ?', (destination,))
+            etapes = 1
+        else:
+            cible = sqlite3.connect(destination)
+            def progression(statut, restantes, total):
+                nonlocal etapes
+                etapes += 1
+            try:
+                conn.backup(cible, pages=PAGES_PAR_ETAPE, progress=progression, sleep=0.005)
+            finally:
+                cible.close()
+    finally:
+        conn.close()
+    return etapes
+
+def creer_instantane(destination, mode='vacuum'):
+    # vacuum : VACUUM INTO, une seule transaction de lecture (en WAL, les écritures continuent)
+    # backup : API de sauvegarde en ligne, PAGES_PAR_ETAPE pages par étape
+    # Copie et sonde dans des threads système : le worker gevent continue de servir pendant ce temps
+    source = db.engine.url.database
+    debut = time.monotonic()
+    with SondeEcriture(source) as sonde:
+        etapes = thread_systeme(_copier_base, source, destination, mode)()
+    duree = time.monotonic() - debut
+    taille = os.path.getsize(destination)
+    attentes = sonde.attentes or [0.0]
+    return {
+        'mode': mode,
+        'duree_ms': round(duree * 1000, 1),
+        'octets': taille,
+        'debit_mo_s': round(taille / duree / 1e6, 2) if duree else None,
+        'etapes': etapes,
+        'ecritures_sondees': len(sonde.attentes),
+        'attente_ecriture_max_ms': round(max(attentes) * 1000, 2),
+        'attente_ecriture_moy_ms': round(sum(attentes) / len(attentes) * 1000, 2),
+    }
+
+def flux_gzip(chemin, taille_bloc=1 << 20):
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 : en-tête gzip
+    with open(chemin, 'rb') as f:
+        while bloc := f.read(taille_bloc):
+            donnees = compresseur.compress(bloc)
+            if donnees:
+                yield donnees
+            time.sleep(0.001)  # vraie pause : sous gevent, sleep(0) ne fait pas tourner la boucle d'E/S
+    yield compresseur.flush()
+
+def admin_autorise():
+    # Désactivé tant que ADMIN_TOKEN n'est pas défini
+    jeton = os.environ.get('ADMIN_TOKEN')
+    return bool(jeton) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), jeton)
+
+@bp_admin.route('/admin/sauvegarde', methods=['GET'])
+def telecharger_sauvegarde():
+    if not admin_autorise():
+        return jsonify({'error': 'Accès refusé'}), 403
+    mode = request.args.get('mode', 'vacuum')
+    if mode not in ('vacuum', 'backup'):
+        return jsonify({'error': 'Le mode doit être vacuum ou backup'}), 400
+
+    dossier = tempfile.mkdtemp()
+    chemin = os.path.join(dossier, 'convertis.db')
+    try:
+        rapport = creer_instantane(chemin, mode)
+    except Exception:
+        shutil.rmtree(dossier, ignore_errors=True)
+        raise
+    current_app.logger.info('Sauvegarde : %s', rapport)
+
+    def flux():
+        try:
+            yield from flux_gzip(chemin)
+        finally:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+    nom = f"convertis-{datetime.utcnow():%Y%m%d-%H%M%S}.db.gz"
+    return Response(flux(), mimetype='application/gzip', headers={
+        'Content-Disposition': f'attachment; filename={nom}',
+        'X-Sauvegarde-Rapport': json.dumps(rapport),
+    })
 
-        function closeAddModal() {
-            document.getElementById('addModal').classList.remove('active');
-            document.body.style.overflow = 'auto';
-            document.getElementById('addPersonForm').reset();
-        }
+@bp.cli.command('sauvegarder')
+@click.argument('destination')
+@click.option('--mode', type=click.Choice(['vacuum', 'backup']), default='vacuum')
+def sauvegarder_commande(destination, mode):
+    """Sauvegarde convertis.db à chaud (compressée si DESTINATION finit par .gz)."""
+    dossier = tempfile.mkdtemp()
+    try:
+        chemin = os.path.join(dossier, 'convertis.db')
+        rapport = creer_instantane(chemin, mode)
+        if destination.endswith('.gz'):
+            with open(destination, 'wb') as f:
+                for bloc in flux_gzip(chemin):
+                    f.write(bloc)
+        else:
+            shutil.move(chemin, destination)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+    for cle, valeur in rapport.items():
+        click.echo(f'{cle}: {valeur}')
+
+# 🛠️ Commandes de maintenance (flask --app app <commande>)
+NOMS_SYNTHETIQUES = ['Rakoto', 'Rabe', 'Randria', 'Razafy', 'Rasoa', 'Andria', 'Ravelo', 'Rajaona']
+SYLLABES = ['ma', 'la', 'na', 'so', 'be', 'to', 'ny', 'fi', 'ha', 'va', 'ri', 'zo', 'mi', 'ka']
+PRENOMS_SYNTHETIQUES = ['Jean', 'Marie', 'Hery', 'Fara', 'Tiana', 'Nirina', 'Mamy', 'Lova', 'Faly', 'Voahirana']
+
+def inserer_en_masse(lignes):
+    # Insertion directe (sans objets ORM) avec ids explicites, clés phonétiques et trigrammes
+    for ligne in lignes:
+        ligne.setdefault('paroisse_id', PAROISSE_DEFAUT)
+        ligne['nom_phonetique'] = cle_phonetique(ligne['nom'])
+        ligne['prenom_phonetique'] = cle_phonetique(ligne['prenom'])
+    db.session.execute(PersonneConvertie.__table__.insert(), lignes)
+    compter_inscriptions([(ligne['paroisse_id'], ligne.get('date_ajout'), ligne['commune_id']) for ligne in lignes])
+    db.session.execute(TrigrammeNom.__table__.insert(), [
+        {'paroisse_id': ligne['paroisse_id'], 'trigramme': t, 'personne_id': ligne['id']}
+        for ligne in lignes for t in trigrammes(ligne['nom'], ligne['prenom'])])
+
+def reconstruire_index_noms(taille_lot=5000):
+    TrigrammeNom.query.delete()
+    dernier_id = 0
+    while True:
+        lignes = (db.session.query(PersonneConvertie.id, PersonneConvertie.paroisse_id,
+                                   PersonneConvertie.nom, PersonneConvertie.prenom)
+                  .filter(PersonneConvertie.id > dernier_id)
+                  .order_by(PersonneConvertie.id).limit(taille_lot).all())
+        if not lignes:
+            break
+        db.session.execute(db.update(PersonneConvertie), [
+            {'id': i, 'nom_phonetique': cle_phonetique(nom), 'prenom_phonetique': cle_phonetique(prenom)}
+            for i, _, nom, prenom in lignes])
+        db.session.execute(TrigrammeNom.__table__.insert(), [
+            {'paroisse_id': paroisse_id, 'trigramme': t, 'personne_id': i}
+            for i, paroisse_id, nom, prenom in lignes for t in trigrammes(nom, prenom)])
+        dernier_id = lignes[-1][0]
+    db.session.commit()
 
-        // Search functionality
-        document.getElementById('searchInput').addEventListener('input', function(e) {
-            const searchTerm = e.target.value.toLowerCase();
-            const filteredPeople = people.filter(person => {
-                const fullName = `${person.prenom} ${person.nom}`.toLowerCase();
-                const commune = person.commune.toLowerCase();
-                const fokontany = person.fokontany.toLowerCase();
-                const quartier = (person.quartier || '').toLowerCase();
-                const inviteur = (person.nom_inviteur || '').toLowerCase();
-                
-                return fullName.includes(searchTerm) || 
-                       commune.includes(searchTerm) || 
-                       fokontany.includes(searchTerm) ||
-                       quartier.includes(searchTerm) ||
-                       inviteur.includes(searchTerm);
-            });
-            
-            renderPeople(filteredPeople);
-        });
-
-        // Form submission
-        document.getElementById('addPersonForm').addEventListener('submit', async function(e) {
-            e.preventDefault();
-            
-            const formData = new FormData(this);
-            const personData = {
-                nom: formData.get('nom'),
-                prenom: formData.get('prenom'),
-                telephone: formData.get('telephone'),
-                commune: formData.get('commune'),
-                fokontany: formData.get('fokontany'),
-                quartier: formData.get('quartier'),
-                nom_inviteur: formData.get('nom_inviteur')
-            };
-            
-            try {
-                await addPerson(personData);
-                closeAddModal();
-            } catch (error) {
-                // Error is already handled in addPerson function
-            }
-        });
-
-        // Close modal when clicking outside
-        document.getElementById('addModal').addEventListener('click', function(e) {
-            if (e.target === this) {
-                closeAddModal();
-            }
-        });
-
-        // Prevent modal close when clicking inside modal content
-        document.querySelector('.modal-content').addEventListener('click', function(e) {
-            e.stopPropagation();
-        });
-
-        // Keyboard shortcuts
-        document.addEventListener('keydown', function(e) {
-            if (e.key === 'Escape') {
-                closeAddModal();
-            }
-            if (e.ctrlKey && e.key === 'n') {
-                e.preventDefault();
-                openAddModal();
-            }
-        });
-
-        // Auto-refresh data every 30 seconds
-        setInterval(() => {
-            loadPeople();
-        }, 30000);
-    </script>
-</body>
-</html>"""
+def lots_export(archives=True, taille_lot=5000, requete=None):
+    # Dictionnaires par lots depuis la table chaude ou la vue convertis_tous, en flux
+    if requete is None:
+        requete = selection_convertis(vue_convertis_tous if archives else None)
+    resultat = db.session.execute(requete.execution_options(stream_results=True))
+    for lignes in resultat.partitions(taille_lot):
+        yield lignes_en_dicts(lignes)
+
+# 📊 Export analytique Parquet / Arrow IPC (pyarrow facultatif, importé à la demande)
+TAILLE_GROUPE_LIGNES = 50000
+COLONNES_DICTIONNAIRE = ('commune', 'fokontany', 'nom_inviteur')
+FORMATS_ANALYTIQUES = {'parquet': 'application/vnd.apache.parquet',
+                       'arrow': 'application/vnd.apache.arrow.stream'}
+
+def schema_analytique(pa):
+    # Mêmes noms de colonnes que le JSON (data_ajout compris), mais date typée
+    types = {'id': pa.int64(), COLONNES_CONVERTI[-1]: pa.timestamp('s')}
+    return pa.schema([(c, pa.dictionary(pa.int32(), pa.string()) if c in COLONNES_DICTIONNAIRE
+                       else types.get(c, pa.string())) for c in COLONNES_CONVERTI])
+
+def _colonne_arrow(pa, valeurs, type_):
+    if pa.types.is_dictionary(type_):
+        return pa.array(valeurs, type=pa.string()).dictionary_encode()
+    if pa.types.is_timestamp(type_):
+        return pa.array(valeurs, type=pa.string()).cast(type_)  # 'AAAA-MM-JJ HH:MM:SS' de SQLite
+    return pa.array(valeurs, type=type_)
+
+def lots_analytiques(pa, requete=None, taille_lot=TAILLE_GROUPE_LIGNES):
+    # Un RecordBatch par lot : seules taille_lot lignes sont en mémoire à la fois
+    if requete is None:
+        requete = selection_convertis(vue_convertis_tous)
+    schema = schema_analytique(pa)
+    resultat = db.session.execute(requete.execution_options(stream_results=True))
+    for lignes in resultat.partitions(taille_lot):
+        colonnes = zip(*lignes)
+        yield pa.record_batch([_colonne_arrow(pa, valeurs, champ.type)
+                               for valeurs, champ in zip(colonnes, schema)], schema=schema)
+
+def ouvrir_ecrivain_analytique(pa, format_, destination):
+    schema = schema_analytique(pa)
+    if format_ == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(destination, schema, use_dictionary=list(COLONNES_DICTIONNAIRE))
+    return pa.ipc.new_stream(destination, schema)
+
+class TamponFlux:
+    # Fichier en écriture seule dont on reprend les octets au fil de l'écriture
+    def __init__(self):
+        self.morceaux = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, donnees):
+        donnees = bytes(donnees)
+        self.morceaux.append(donnees)
+        self.position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self):
+        octets, self.morceaux = b''.join(self.morceaux), []
+        return octets
+
+def apres_ecriture_massive():
+    journaliser('reset', {})
+    db.session.commit()
+    cache_reponses.vider()
+    cache_partage().incrementer(CLE_VERSION)
+
+@bp.cli.command('initialiser-base')
+def initialiser_base_commande():
+    """Crée les tables et applique les migrations."""
+    initialiser_base()
+    click.echo('Base initialisée')
+
+@bp.cli.command('peupler')
+@click.argument('nombre', type=int)
+@click.option('--jours', type=int, default=365, help='Étalement des dates d\'ajout')
+@click.option('--communes', type=int, default=20)
+@click.option('--paroisse', default=None, help='Clé de la paroisse (par défaut : paroisse principale)')
+def peupler_commande(nombre, jours, communes, paroisse):
+    """Insère NOMBRE inscriptions synthétiques (tests de charge)."""
+    debut = time.monotonic()
+    paroisse_id = PAROISSE_DEFAUT
+    if paroisse:
+        trouvee = Paroisse.query.filter_by(cle=paroisse).first()
+        if trouvee is None:
+            raise click.ClickException(f'Paroisse inconnue : {paroisse}')
+        paroisse_id = trouvee.id
+    lieux = [resoudre_lieux(f'Commune {c}', f'Fokontany {c}-{f}', f'Quartier {f}' if f % 2 else '')
+             for c in range(communes) for f in range(10)]
+    db.session.commit()
+    prochain_id = (db.session.query(db.func.max(PersonneConvertie.id)).scalar() or 0) + 1
+    maintenant = datetime.utcnow()
+    for depart in range(0, nombre, 5000):
+        lignes = []
+        for i in range(prochain_id + depart, prochain_id + min(depart + 5000, nombre)):
+            commune_id, fokontany_id, quartier_id = random.choice(lieux)
+            lignes.append({
+                'id': i,
+                'paroisse_id': paroisse_id,
+                'nom': random.choice(NOMS_SYNTHETIQUES) + ''.join(random.choices(SYLLABES, k=random.randint(1, 3))),
+                'prenom': random.choice(PRENOMS_SYNTHETIQUES),
+                'telephone': f'03{random.choice("2348")}{random.randint(0, 9999999):07d}' if random.random() < 0.7 else '',
+                'commune_id': commune_id,
+                'fokontany_id': fokontany_id,
+                'quartier_id': quartier_id,
+                'nom_inviteur': random.choice(PRENOMS_SYNTHETIQUES) if random.random() < 0.5 else '',
+                'date_ajout': maintenant - timedelta(seconds=random.randint(0, jours * 86400)),
+            })
+        inserer_en_masse(lignes)
+        db.session.commit()
+    apres_ecriture_massive()
+    duree = time.monotonic() - debut
+    click.echo(f'{nombre} inscriptions en {duree:.1f} s ({nombre / duree:.0f}/s)')
+
+@bp.cli.command('reconstruire-index')
+def reconstruire_index_commande():
+    """Reconstruit index SQLite, index de noms, vue d'archives et compteurs journaliers."""
+    debut = time.monotonic()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('REINDEX')
+    reconstruire_index_noms()
+    creer_vue_convertis_tous()
+    reconstruire_compteurs()
+    apres_ecriture_massive()
+    click.echo(f'Index reconstruits en {time.monotonic() - debut:.1f} s')
+
+@bp.cli.command('analyser')
+def analyser_commande():
+    """Met à jour les statistiques du planificateur de requêtes SQLite."""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('ANALYZE')
+        conn.exec_driver_sql('PRAGMA optimize')
+    click.echo('ANALYZE terminé')
+
+@bp.cli.command('verifier')
+def verifier_commande():
+    """Contrôle d'intégrité SQLite et cohérence des données."""
+    problemes = []
+    with db.engine.connect() as conn:
+        resultat = [r[0] for r in conn.exec_driver_sql('PRAGMA integrity_check')]
+        if resultat != ['ok']:
+            problemes += resultat
+    for colonne, modele in ((PersonneConvertie.commune_id, Commune),
+                            (PersonneConvertie.fokontany_id, Fokontany),
+                            (PersonneConvertie.quartier_id, Quartier)):
+        orphelins = (db.session.query(db.func.count(PersonneConvertie.id))
+                     .outerjoin(modele, colonne == modele.id)
+                     .filter(colonne.isnot(None), modele.id.is_(None)).scalar())
+        if orphelins:
+            problemes.append(f'{orphelins} inscriptions avec un {modele.__tablename__} inexistant')
+    sans_cle = PersonneConvertie.query.filter(PersonneConvertie.nom_phonetique.is_(None)).count()
+    if sans_cle:
+        problemes.append(f'{sans_cle} inscriptions non indexées (flask reconstruire-index)')
+    comptees = db.session.query(db.func.coalesce(db.func.sum(CompteurJour.total), 0)).scalar()
+    reelles = db.session.execute(db.select(db.func.count()).select_from(vue_convertis_tous)).scalar()
+    if comptees != reelles:
+        problemes.append(f'Compteurs journaliers : {comptees} au lieu de {reelles} (flask reconstruire-index)')
+    for probleme in problemes:
+        click.echo(probleme)
+    if problemes:
+        raise SystemExit(1)
+    click.echo('Aucun problème détecté')
+
+@bp.cli.command('exporter')
+@click.argument('destination')
+@click.option('--format', 'format_', type=click.Choice(['ndjson', 'parquet', 'arrow']), default='ndjson')
+@click.option('--archives/--sans-archives', default=True)
+def exporter_commande(destination, format_, archives):
+    """Exporte les inscriptions en NDJSON, Parquet ou Arrow IPC, lot par lot."""
+    total = 0
+    if format_ in FORMATS_ANALYTIQUES:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise click.ClickException('Le module pyarrow est requis pour l\'export Parquet/Arrow')
+        requete = selection_convertis(vue_convertis_tous if archives else None)
+        with ouvrir_ecrivain_analytique(pa, format_, destination) as ecrivain:
+            for lot in lots_analytiques(pa, requete):
+                ecrivain.write_batch(lot)
+                total += lot.num_rows
+    else:
+        with open(destination, 'w', encoding='utf-8') as f:
+            for lot in lots_export(archives):
+                f.writelines(json.dumps(d, ensure_ascii=False) + '\n' for d in lot)
+                total += len(lot)
+    click.echo(f'{total} inscriptions exportées vers {destination}')
+
+@bp.cli.command('importer-coordonnees')
+@click.argument('fichier', type=click.Path(exists=True))
+def importer_coordonnees_commande(fichier):
+    """Charge les centroïdes des fokontany (CSV/XLSX : commune, fokontany, latitude, longitude)."""
+    mis_a_jour, erreurs = enregistrer_coordonnees(lire_lignes(fichier, os.path.splitext(fichier)[1].lower()))
+    for erreur in erreurs[:20]:
+        click.echo(f"Ligne {erreur['ligne']} : {erreur['erreur']}")
+    click.echo(f'{mis_a_jour} fokontany localisés, {len(erreurs)} erreurs')
+
+@bp.cli.command('creer-paroisse')
+@click.argument('cle')
+@click.argument('nom')
+def creer_paroisse_commande(cle, nom):
+    """Crée une paroisse, servie sous /paroisses/CLE/..."""
+    paroisse, erreur = creer_paroisse(cle, nom)
+    if erreur:
+        raise click.ClickException(erreur)
+    click.echo(f'Paroisse {paroisse.cle} créée (id {paroisse.id})')
+
+@bp.route('/', methods=['GET'])
+def index():
+    # Page servie depuis le disque (ETag, 304) au lieu d'une chaîne de 40 Ko à l'import
+    return send_from_directory(current_app.root_path, 'index.html')
+
+# 🏗️ Fabrique d'application
+def create_app(config=None):
+    app = Flask(__name__)
+    CORS(app)
+
+    # Configuration de SQLite
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///convertis.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Le pool borne l'accès à la base : avec les workers gevent, les greenlets en
+    # surnombre attendent une connexion de manière coopérative, et le verrou d'écriture
+    # aussi (ConnexionCooperative).
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'connect_args': {'factory': ConnexionCooperative},
+    }
+    app.config['CACHE_URL'] = os.environ.get('CACHE_URL', '')
+    # Seau par client : LIMITE_JETONS de rafale, LIMITE_DEBIT jetons/s (0 jeton : désactivé)
+    app.config['LIMITE_JETONS'] = int(os.environ.get('LIMITE_JETONS', 120))
+    app.config['LIMITE_DEBIT'] = float(os.environ.get('LIMITE_DEBIT', 2))
+    app.config['LIMITE_CONCURRENCE'] = int(os.environ.get('LIMITE_CONCURRENCE', 6))
+    app.config['LIMITE_CONCURRENCE_PAROISSE'] = int(os.environ.get('LIMITE_CONCURRENCE_PAROISSE', 4))
+    app.config.update(config or {})
+
+    # Rien ici n'ouvre de connexion : le moteur et le cache se connectent au premier usage
+    db.init_app(app)
+    app.extensions['cache_partage'] = creer_cache_partage(app)
+    app.register_blueprint(bp)
+    # Mêmes routes par paroisse : /paroisses/<cle>/convertis...
+    app.register_blueprint(bp, name='paroisse', url_prefix='/paroisses/<paroisse>')
+    app.register_blueprint(bp_admin)
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        initialiser_base()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,89 @@
+"""Charge de clients lents contre un serveur en cours d'exécution.
+
+Ouvre N connexions qui envoient puis lisent GET /convertis au compte-gouttes
+(comme des mobiles en 2G), puis mesure la latence d'un client rapide qui interroge
+GET /convertis/<id> pendant ce temps.
+
+    gunicorn -c gunicorn.conf.py                    # gevent (wsgi_app = app:create_app())
+    GUNICORN_WORKER_CLASS=gthread gunicorn -c gunicorn.conf.py    # 32 threads par défaut
+    python benchmarks/bench_clients_lents.py --port 10000 --clients 500
+
+Pas d'argument app:app : il remplacerait wsgi_app. GUNICORN_WORKER_CLASS=sync est
+ramené à gthread par gunicorn.conf.py.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+
+async def client_lent(hote, port, chemin, octets_par_pas, pause, arret):
+    try:
+        lecteur, ecrivain = await asyncio.open_connection(hote, port)
+    except OSError:
+        return 'refus'
+    requete = f'GET {chemin} HTTP/1.1\r\nHost: {hote}\r\nConnection: close\r\n\r\n'.encode()
+    try:
+        # Envoi de la requête au compte-gouttes, puis lecture au compte-gouttes
+        for i in range(0, len(requete), 8):
+            ecrivain.write(requete[i:i + 8])
+            await ecrivain.drain()
+            await asyncio.sleep(pause)
+        while not arret.is_set():
+            if not await lecteur.read(octets_par_pas):
+                return 'fini'
+            await asyncio.sleep(pause)
+        return 'en cours'
+    except OSError:
+        return 'erreur'
+    finally:
+        ecrivain.close()
+
+
+async def sonde(hote, port, chemin, duree):
+    latences, echecs = [], 0
+    fin = time.monotonic() + duree
+    while time.monotonic() < fin:
+        debut = time.monotonic()
+        try:
+            lecteur, ecrivain = await asyncio.wait_for(asyncio.open_connection(hote, port), 10)
+            ecrivain.write(f'GET {chemin} HTTP/1.1\r\nHost: {hote}\r\nConnection: close\r\n\r\n'.encode())
+            await asyncio.wait_for(lecteur.read(), 10)
+            ecrivain.close()
+            latences.append(time.monotonic() - debut)
+        except (OSError, asyncio.TimeoutError):
+            echecs += 1
+        await asyncio.sleep(0.1)
+    return latences, echecs
+
+
+async def principal(args):
+    arret = asyncio.Event()
+    lents = [asyncio.create_task(client_lent(args.hote, args.port, '/convertis', args.octets, args.pause, arret))
+             for _ in range(args.clients)]
+    await asyncio.sleep(2)  # laisse les clients lents occuper le serveur
+    latences, echecs = await sonde(args.hote, args.port, '/convertis/1', args.duree)
+    arret.set()
+    etats = await asyncio.gather(*lents)
+
+    print(f'{args.clients} clients lents : ' + ', '.join(
+        f'{etat}={etats.count(etat)}' for etat in sorted(set(etats))))
+    if latences:
+        latences.sort()
+        print(f'sonde : {len(latences)} réponses, {echecs} échecs')
+        print(f'  p50 = {statistics.median(latences) * 1000:.1f} ms')
+        print(f'  p95 = {latences[int(len(latences) * 0.95) - 1] * 1000:.1f} ms')
+        print(f'  max = {latences[-1] * 1000:.1f} ms')
+    else:
+        print(f'sonde : aucune réponse, {echecs} échecs')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--octets', type=int, default=512, help='octets lus par pas')
+    parser.add_argument('--pause', type=float, default=0.5, help='secondes entre deux envois/lectures')
+    parser.add_argument('--duree', type=float, default=10, help='durée de la sonde en secondes')
+    asyncio.run(principal(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""Temps de démarrage à froid : de l'import à la première réponse.
+
+Mode processus (par défaut) : lance N interpréteurs neufs qui importent app,
+appellent create_app() puis servent GET / et GET /convertis/stats via le client
+de test. Mode gunicorn : démarre gunicorn -c gunicorn.conf.py et mesure le délai
+jusqu'au premier 200 sur GET /.
+
+    python benchmarks/bench_demarrage.py --repetitions 10
+    python benchmarks/bench_demarrage.py --mode gunicorn
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENFANT = '''
+import json, time
+t0 = time.perf_counter()
+import app as module
+t1 = time.perf_counter()
+application = module.create_app()
+t2 = time.perf_counter()
+client = application.test_client()
+assert client.get('/').status_code == 200
+t3 = time.perf_counter()
+assert client.get('/convertis/stats').status_code == 200
+t4 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'premiere_page': t3 - t2,
+                  'premiere_requete_base': t4 - t3, 'total': t4 - t0}))
+'''
+
+
+def environnement(dossier):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(dossier, 'bench.db')}",
+               CACHE_URL=os.path.join(dossier, 'cache.db'))
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'initialiser-base'],
+                   cwd=RACINE, env=env, check=True, capture_output=True)
+    return env
+
+
+def mode_processus(env, repetitions):
+    mesures = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        sortie = subprocess.run([sys.executable, '-c', ENFANT], cwd=RACINE, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        mesure = json.loads(sortie.strip().splitlines()[-1])
+        mesure['processus'] = time.perf_counter() - debut  # interpréteur compris
+        mesures.append(mesure)
+    print(f'{repetitions} démarrages à froid (médiane / max, ms) :')
+    for phase in mesures[0]:
+        valeurs = [m[phase] * 1000 for m in mesures]
+        print(f'  {phase:<22} {statistics.median(valeurs):8.1f} {max(valeurs):8.1f}')
+
+
+def mode_gunicorn(env, port):
+    env = dict(env, PORT=str(port))
+    debut = time.perf_counter()
+    serveur = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                               cwd=RACINE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - debut < 60:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1) as reponse:
+                    if reponse.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.02)
+        print(f'gunicorn : première réponse après {(time.perf_counter() - debut) * 1000:.0f} ms')
+    finally:
+        serveur.terminate()
+        serveur.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['processus', 'gunicorn'], default='processus')
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--port', type=int, default=10099)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as dossier:
+        env = environnement(dossier)
+        if args.mode == 'processus':
+            mode_processus(env, args.repetitions)
+        else:
+            mode_gunicorn(env, args.port)
@@ -0,0 +1,77 @@
+"""Encodage / décodage des listes d'inscriptions : JSON, MessagePack et CBOR.
+
+Mesure, pour N lignes de la forme de to_dict(), le temps de sérialisation côté
+serveur (app.serialiser, dates natives comprises), le temps de décodage et la
+taille du corps, brut et gzip.
+
+    python benchmarks/bench_formats.py --lignes 100000 --repetitions 5
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as module  # noqa: E402
+
+
+def lignes_synthetiques(nombre):
+    debut = datetime(2024, 1, 1)
+    return [{
+        'id': i,
+        'nom': random.choice(module.NOMS_SYNTHETIQUES) + ''.join(random.choices(module.SYLLABES, k=2)),
+        'prenom': random.choice(module.PRENOMS_SYNTHETIQUES),
+        'telephone': f'034{random.randint(0, 9999999):07d}',
+        'commune': f'Commune {random.randint(0, 19)}',
+        'fokontany': f'Fokontany {random.randint(0, 199)}',
+        'quartier': random.choice(['', 'Quartier 1', 'Quartier 3']),
+        'nom_inviteur': random.choice(module.PRENOMS_SYNTHETIQUES + [''] * 4),
+        'data_ajout': (debut + timedelta(seconds=random.randint(0, 2 * 365 * 86400))).strftime('%Y-%m-%d %H:%M:%S'),
+    } for i in range(1, nombre + 1)]
+
+
+def decodeurs():
+    resultat = {'json': json.loads}
+    if module.module_format('msgpack'):
+        resultat['msgpack'] = lambda corps: module.module_format('msgpack').unpackb(corps, timestamp=3)
+    if module.module_format('cbor'):
+        resultat['cbor'] = module.module_format('cbor').loads
+    return resultat
+
+
+def chronometrer(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=100000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(1)
+    modele = lignes_synthetiques(args.lignes)
+    app = module.create_app()
+    print(f'{args.lignes} lignes, médiane de {args.repetitions} passes')
+    print(f"{'format':<9}{'encodage ms':>13}{'décodage ms':>13}{'octets':>12}{'gzip':>11}")
+    with app.test_request_context():
+        for format_, decoder in decodeurs().items():
+            # Copie fraîche à chaque passe : la conversion des dates se fait en place
+            encodage = chronometrer(lambda: module.serialiser([dict(l) for l in modele], format_),
+                                    args.repetitions)
+            encodage -= chronometrer(lambda: [dict(l) for l in modele], args.repetitions)
+            corps = module.serialiser([dict(l) for l in modele], format_)
+            decodage = chronometrer(lambda: decoder(corps), args.repetitions)
+            print(f'{format_:<9}{encodage * 1000:>13.1f}{decodage * 1000:>13.1f}'
+                  f'{len(corps):>12}{len(gzip.compress(corps, 6)):>11}')
@@ -0,0 +1,56 @@
+"""Débit de normaliser_converti : validations par seconde.
+
+Rejoue un mélange de lignes propres, à normaliser (casse, espaces, indicatif
++261) et invalides (téléphone, longueur, champ manquant), comme le ferait un
+import en masse.
+
+    python benchmarks/bench_validation.py --lignes 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as module  # noqa: E402
+
+
+def ligne_aleatoire():
+    ligne = {
+        'nom': random.choice(module.NOMS_SYNTHETIQUES) + ''.join(random.choices(module.SYLLABES, k=2)),
+        'prenom': random.choice(module.PRENOMS_SYNTHETIQUES),
+        'telephone': f'03{random.choice("2348")}{random.randint(0, 9999999):07d}',
+        'commune': f'Commune {random.randint(0, 19)}',
+        'fokontany': f'Fokontany {random.randint(0, 199)}',
+        'quartier': random.choice(['', 'Quartier 1']),
+        'nom_inviteur': random.choice(module.PRENOMS_SYNTHETIQUES + ['']),
+        'date_ajout': '2025-06-01 08:30:00' if random.random() < 0.3 else '',
+    }
+    tirage = random.random()
+    if tirage < 0.3:  # saisie à normaliser
+        ligne['nom'] = f"  {ligne['nom'].upper()}  "
+        ligne['telephone'] = '+261 ' + ' '.join([ligne['telephone'][1:3], ligne['telephone'][3:5],
+                                                 ligne['telephone'][5:8], ligne['telephone'][8:]])
+    elif tirage < 0.35:
+        ligne['telephone'] = '12345'
+    elif tirage < 0.38:
+        ligne['prenom'] = ''
+    elif tirage < 0.40:
+        ligne['nom'] = 'x' * 150
+    return ligne
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=200000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    lignes = [ligne_aleatoire() for _ in range(args.lignes)]
+    debut = time.perf_counter()
+    erreurs = sum(1 for ligne in lignes if module.normaliser_converti(ligne)[1])
+    duree = time.perf_counter() - debut
+    print(f'{args.lignes} lignes en {duree:.2f} s : {args.lignes / duree:,.0f} validations/s, '
+          f'{erreurs} rejetées ({erreurs / args.lignes:.1%})')
@@ -0,0 +1,49 @@
+# Configuration gunicorn pour Render (gunicorn -c gunicorn.conf.py)
+import os
+
+# Workers gevent : une connexion lente (mobile, flux SSE) n'occupe qu'un greenlet
+# au lieu d'un worker entier. GUNICORN_WORKER_CLASS=gthread pour se passer de gevent :
+# chaque flux SSE occupe alors un thread jusqu'à 5 minutes. Pas de worker sync, qu'un
+# seul flux bloquerait : la valeur sync est remplacée par gthread.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+if worker_class == 'sync':
+    worker_class = 'gthread'
+if worker_class == 'gevent':
+    # preload_app importe l'application dans le maître : le patch doit la précéder
+    from gevent import monkey
+    monkey.patch_all()
+
+wsgi_app = 'app:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# Application chargée une fois dans le maître puis partagée par fork (copie sur
+# écriture) : un worker démarre sans réimporter Flask/SQLAlchemy. L'import ne fait
+# aucune E/S base et ne lance aucun thread, le fork est donc sans risque.
+preload_app = True
+
+# Offre gratuite : 512 Mo et un demi-CPU, deux processus suffisent
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+# gthread : assez de threads pour les flux SSE ouverts en plus des requêtes courtes
+threads = int(os.environ.get('GUNICORN_THREADS', '32' if worker_class == 'gthread' else '1'))
+
+# Délais
+timeout = 60            # worker bloqué (gevent : boucle d'événements figée)
+graceful_timeout = 30
+keepalive = 5           # réutilise la connexion d'un client entre deux requêtes
+
+# Recyclage des workers pour contenir la mémoire sur l'offre gratuite
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Création/migration du schéma une seule fois, dans un processus à part, avant
+    # le démarrage des workers : ils ne se disputent plus la même migration.
+    import subprocess
+    import sys
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'initialiser-base'],
+                   cwd=server.app.cfg.chdir, check=True)
@@ -0,0 +1,22 @@
+import pytest
+
+from app import create_app, db, initialiser_base
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'convertis.db'}",
+        'CACHE_URL': str(tmp_path / 'cache.db'),
+        'LIMITE_JETONS': 0,
+    })
+    with app.app_context():
+        initialiser_base()
+    client = app.test_client()
+    for nom in ('Rakoto', 'Rabe', 'Rasoa'):
+        reponse = client.post('/convertis', json={'nom': nom, 'prenom': 'Jean', 'commune': 'Antananarivo',
+                                                  'fokontany': 'Analakely'})
+        assert reponse.status_code == 201
+    yield client
+    with app.app_context():
+        db.engine.dispose()
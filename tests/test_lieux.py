@@ -0,0 +1,63 @@
+import pytest
+
+
+def ajouter(client, commune):
+    reponse = client.post('/convertis', json={'nom': 'Rakoto', 'prenom': 'Paul', 'commune': commune,
+                                              'fokontany': 'Analakely'})
+    assert reponse.status_code == 201
+    return client.get(f"/convertis/{reponse.get_json()['id']}").get_json()
+
+
+def alias(client, valeur, cible, prefixe='', jeton='secret'):
+    return client.post(f'{prefixe}/lieux/alias', json={'type': 'commune', 'alias': valeur, 'cible': cible},
+                       headers={'X-Admin-Token': jeton})
+
+
+@pytest.fixture(autouse=True)
+def jeton_admin(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+
+
+def communes(client):
+    return sorted(client.get('/convertis/unique-values').get_json()['communes'])
+
+
+def test_alias_vers_orthographe_inconnue_renomme_le_lieu(client):
+    ajouter(client, 'Fianar')
+    assert alias(client, 'Fianar', 'Fianarantsoa').status_code == 201
+    assert communes(client) == ['Antananarivo', 'Fianarantsoa']
+    assert ajouter(client, 'Fianarantsoa')['commune'] == 'Fianarantsoa'
+
+
+def test_alias_inverse_refuse(client):
+    ajouter(client, 'Tana')
+    assert alias(client, 'Tana', 'Antananarivo').status_code == 201
+    assert alias(client, 'Antananarivo', 'Tana').status_code == 400
+    assert alias(client, 'antananarivo', 'TANA').status_code == 400
+    assert communes(client) == ['Antananarivo']
+    assert ajouter(client, 'Tana')['commune'] == 'Antananarivo'
+
+
+def test_alias_en_chaine_suit_la_nouvelle_cible(client):
+    ajouter(client, 'Tana')
+    assert alias(client, 'Tana', 'Antananarivo').status_code == 201
+    assert alias(client, 'Antananarivo', 'Antananarivo Renivohitra').status_code == 201
+    assert alias(client, 'Tananarive', 'Tana').status_code == 201
+    assert communes(client) == ['Antananarivo Renivohitra']
+    for variante in ('Tana', 'Antananarivo', 'Tananarive'):
+        assert ajouter(client, variante)['commune'] == 'Antananarivo Renivohitra'
+
+
+def test_alias_reserve_a_l_administration(client):
+    ajouter(client, 'Tana')
+    assert alias(client, 'Tana', 'Antananarivo', jeton='faux').status_code == 403
+    assert communes(client) == ['Antananarivo', 'Tana']
+
+
+def test_routes_communes_absentes_sous_une_paroisse(client):
+    assert client.post('/paroisses', json={'cle': 'p2', 'nom': 'Paroisse 2'},
+                       headers={'X-Admin-Token': 'secret'}).status_code == 201
+    assert alias(client, 'Tana', 'Antananarivo', prefixe='/paroisses/p2').status_code == 404
+    for chemin in ('/paroisses/p2/paroisses', '/paroisses/p2/cache/stats', '/paroisses/p2/admin/sauvegarde'):
+        assert client.get(chemin).status_code == 404
+    assert client.get('/paroisses/p2/convertis').status_code == 200
@@ -0,0 +1,36 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from app import PersonneConvertie, archiver_anciens, db, purger_supprimes
+
+
+def ajouter(client, **champs):
+    reponse = client.post('/convertis', json=dict({'nom': 'Rakoto', 'prenom': 'Paul', 'commune': 'Antananarivo',
+                                                   'fokontany': 'Analakely'}, **champs))
+    assert reponse.status_code == 201
+    return reponse.get_json()['id']
+
+
+def test_archivage_deplace_les_inscriptions_anciennes(client):
+    ancien = ajouter(client, date_ajout='2015-03-01 10:00:00')
+    ajouter(client)  # le plus grand id reste dans la table chaude
+    with client.application.app_context():
+        assert archiver_anciens() == 1
+        chemin = db.engine.url.database
+    connexion = sqlite3.connect(chemin)
+    assert connexion.execute('SELECT id, nom FROM personne_convertie_archive_2015').fetchall() == [(ancien, 'Rakoto')]
+    assert connexion.execute('SELECT count(*) FROM trigramme_nom WHERE personne_id = ?', (ancien,)).fetchone()[0] == 0
+    assert connexion.execute('SELECT count(*) FROM convertis_tous').fetchone()[0] == 5
+    connexion.close()
+    assert ancien not in {p['id'] for p in client.get('/convertis').get_json()}
+
+
+def test_purge_des_suppressions_logiques_anciennes(client):
+    id = ajouter(client)
+    assert client.delete(f'/convertis/{id}?soft=1').status_code == 200
+    with client.application.app_context():
+        PersonneConvertie.query.filter_by(id=id).update({'supprime_le': datetime.utcnow() - timedelta(days=365)})
+        db.session.commit()
+        purger_supprimes()
+        assert db.session.get(PersonneConvertie, id) is None
+        assert PersonneConvertie.query.count() == 3
@@ -0,0 +1,44 @@
+import sqlite3
+
+from app import create_app, db, initialiser_base
+
+# Schéma et données de la toute première version (colonnes texte pour les lieux)
+SCHEMA_INITIAL = '''
+CREATE TABLE personne_convertie (
+    id INTEGER NOT NULL, nom VARCHAR(100) NOT NULL, prenom VARCHAR(100) NOT NULL, telephone VARCHAR(20),
+    commune VARCHAR(100) NOT NULL, fokontany VARCHAR(100) NOT NULL, quartier VARCHAR(100),
+    nom_inviteur VARCHAR(100), date_ajout DATETIME, PRIMARY KEY (id));
+INSERT INTO personne_convertie VALUES (1, 'Rakoto', 'Jean', '0341234567', 'Antananarivo', 'Analakely', '', ' rakoto ',
+                                       '2024-01-02 10:00:00');
+INSERT INTO personne_convertie VALUES (2, 'Rabe', 'Paul', '', 'antananarivo', 'Analakely', NULL, 'Rakoto',
+                                       '2024-01-03 10:00:00');
+INSERT INTO personne_convertie VALUES (3, 'Rasoa', 'Marie', NULL, 'Toamasina', 'Ambodimanga', 'Lot 2', '',
+                                       '2024-01-04 10:00:00');
+'''
+
+
+def test_migration_depuis_le_schema_initial(tmp_path):
+    chemin = tmp_path / 'convertis.db'
+    connexion = sqlite3.connect(chemin)
+    connexion.executescript(SCHEMA_INITIAL)
+    connexion.close()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{chemin}', 'CACHE_URL': str(tmp_path / 'cache.db'),
+                      'LIMITE_JETONS': 0})
+    with app.app_context():
+        initialiser_base()
+        initialiser_base()  # idempotente
+        db.engine.dispose()
+
+    connexion = sqlite3.connect(chemin)
+    assert connexion.execute("SELECT name FROM sqlite_master WHERE sql LIKE '%personne_convertie_v1%'").fetchall() == []
+    assert connexion.execute('PRAGMA foreign_key_check').fetchall() == []
+    assert connexion.execute('SELECT count(*) FROM trigramme_nom').fetchone()[0] > 0
+    connexion.close()
+
+    convertis = {p['id']: p for p in app.test_client().get('/convertis').get_json()}
+    assert sorted(convertis) == [1, 2, 3]
+    assert convertis[2]['commune'] == 'Antananarivo'
+    assert convertis[3]['quartier'] == 'Lot 2'
+    # Inviteurs saisis avant la normalisation : regroupés sous une seule orthographe
+    assert app.test_client().get('/convertis/unique-values').get_json()['inviteurs'] == ['Rakoto']
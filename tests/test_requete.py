@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.mark.parametrize('parametres', [
+    'jours=1000000',
+    'jours=-1',
+    'page=100000000000000000000',
+    'page=20002&par_page=500',
+    'date_fin=9999-12-31',
+])
+def test_parametres_hors_limites_refuses(client, parametres):
+    reponse = client.get(f'/convertis/query?{parametres}')
+    assert reponse.status_code == 400
+
+
+def test_jours_dans_les_limites(client):
+    reponse = client.get('/convertis/query?jours=36500')
+    assert reponse.status_code == 200
+    assert reponse.get_json()['total'] == 3
+
+
+def test_inviteur_supprime_absent_des_valeurs_uniques(client):
+    reponse = client.post('/convertis', json={'nom': 'Rakoto', 'prenom': 'Paul', 'commune': 'Toamasina',
+                                              'fokontany': 'Ambodimanga', 'nom_inviteur': 'Hery'})
+    assert reponse.status_code == 201
+    assert 'Hery' in client.get('/convertis/unique-values').get_json()['inviteurs']
+    assert client.delete(f"/convertis/{reponse.get_json()['id']}?soft=1").status_code == 200
+    valeurs = client.get('/convertis/unique-values').get_json()
+    assert 'Hery' not in valeurs['inviteurs']
+    assert 'Toamasina' not in valeurs['communes']
+
+
+def test_filtres_inviteur_insensibles_a_la_casse(client):
+    reponse = client.post('/convertis', json={'nom': 'Rabe', 'prenom': 'Paul', 'commune': 'Antananarivo',
+                                              'fokontany': 'Analakely', 'nom_inviteur': 'JEAN'})
+    assert reponse.status_code == 201
+    for nom in ('jean', 'Jean', ' JEAN '):
+        assert len(client.get(f'/convertis/inviteur/{nom}').get_json()) == 1
+        assert client.get('/convertis/query', query_string={'inviteur': nom}).get_json()['total'] == 1
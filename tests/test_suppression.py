@@ -0,0 +1,40 @@
+import pytest
+
+
+def nombre_convertis(client):
+    return len(client.get('/convertis').get_json())
+
+
+@pytest.mark.parametrize('filtre', [
+    {},
+    {'comune': 'Antananarivo'},
+    {'commune': 'Antananarivo', 'inconnu': 1},
+    {'commune': ''},
+    {'date_debut': 20240101},
+    {'commune': ['Antananarivo']},
+    'commune',
+])
+def test_filtre_vide_ou_invalide_refuse(client, filtre):
+    reponse = client.delete('/convertis', json={'filtre': filtre})
+    assert reponse.status_code == 400
+    assert nombre_convertis(client) == 3
+
+
+def test_filtre_booleen_json(client):
+    reponse = client.delete('/convertis', json={'filtre': {'avec_telephone': True}})
+    assert reponse.status_code == 200
+    assert reponse.get_json()['supprimes'] == 0
+    assert nombre_convertis(client) == 3
+
+
+def test_filtre_reconnu_supprime(client):
+    reponse = client.delete('/convertis', json={'filtre': {'commune': 'antananarivo', 'avec_telephone': False}})
+    assert reponse.status_code == 200
+    assert reponse.get_json()['supprimes'] == 3
+    assert nombre_convertis(client) == 0
+
+
+def test_filtre_jours_hors_limites_refuse(client):
+    reponse = client.delete('/convertis', json={'filtre': {'jours': 1000000}})
+    assert reponse.status_code == 400
+    assert nombre_convertis(client) == 3